@@ -6,90 +6,312 @@ A modern web-based quiz tool for CISSP certification preparation
 
 import os
 import json
+import queue
+import atexit
 import random
-from flask import Flask, render_template, request, jsonify, session, redirect, g
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
+from flask import Flask, render_template, request, jsonify, session, redirect, g, Response
 from datetime import datetime
-import sqlite3
-import hashlib
 
 # Import existing modules
-from quiz_app.data import load_questions
-from quiz_app.db import (init_db, save_result, is_favorite, mark_favorite, 
-                         get_results_summary, get_favorite_questions)
+from quiz_app.data import QuestionStore
+from quiz_app.db import (save_result, get_results_summary, init_db, ResultsCompactor,
+                         get_missed_questions, get_weak_questions, get_trend)
 from quiz_app.config import load_config
-from quiz_app.ollama import list_models, check_ollama_status, ask_model
+from quiz_app.export import DATASETS, FORMATS, iter_export
+from quiz_app.metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as metrics_registry,
+                              SharedMetrics, instrument)
+from quiz_app.ollama import ModelDiscovery, ask_model
+from quiz_app.profiles import DEFAULT_PROFILE, ProfileCatalog, ShardManager
+from quiz_app.sessions import (MemorySessionStore, ServerSideSessionInterface,
+                               SqliteSessionStore)
+from quiz_app.watcher import QuestionBankWatcher
+from quiz_app.deck import Deck
+from quiz_app.payload import PayloadCache
+from quiz_app.search import SearchIndex
+from quiz_app.similarity import RelatedIndex, similarity_available
 
 app = Flask(__name__)
 app.secret_key = 'cissp_quiz_secret_key_change_in_production'
+instrument(app)  # per-route latency, status and size for /metrics
+
+class Bank(NamedTuple):
+    """A question bank and everything built from it, published as one object"""
+    store: QuestionStore
+    search: SearchIndex
+    related: Optional[RelatedIndex]  # needs NumPy; None disables related questions
+    # Recent banks by version, current one included, so a quiz started
+    # before a reload keeps serving the exact questions its deck was built from
+    snapshots: Mapping[str, QuestionStore]
 
 # Global variables
-questions_data = []
-db_path = ""
+# bank is replaced wholesale on hot reload, never mutated in place; requests
+# read it once (current_bank()) so a reload cannot mix an old index with a
+# new store partway through one.
+bank = Bank(QuestionStore(), SearchIndex([]), None, MappingProxyType({}))
+question_watcher = None
+payload_cache = PayloadCache()
+profile_catalog = None  # ProfileCatalog: profile name -> results database
+shards = None  # ShardManager: open per-profile databases, created in init_app
 ollama_model = ""
+ollama_discovery = None
+results_compactor = None  # rolls up old results, see 'retention_days' config
+shared_metrics = None  # SharedMetrics when worker processes report /metrics together
+worker_state = 'starting'  # 'ready' once serving, 'draining' while shutting down
+
+DRILL_SIZE = 10       # questions in a drill set built from a missed question
+MAX_DRILL_SIZE = 50   # largest drill set or related list a client may ask for
+RELATED_PREVIEW = 3   # related questions offered after a wrong answer
+BANK_SNAPSHOTS = 3    # question bank versions kept for quizzes in progress
+MAX_PREFETCH = 20     # questions get_question may return ahead of the current one
+MAX_SEARCH_RESULTS = 100  # largest page /api/search returns
+MAX_SEARCH_DECK = 200     # best matches a search quiz is built from
+MAX_TREND_POINTS = 365    # most buckets per series /api/stats/trend returns
+MAX_TREND_DAYS = 3650     # longest explicit window /api/stats/trend accepts
+SUBMIT_TIMEOUT = 2.0      # seconds an answer may wait for room in the write-behind queue
+
+def current_profile():
+    return session.get('profile', DEFAULT_PROFILE)
+
+def get_shard():
+    """Results database (pool, favorites, writer) of the current request's profile"""
+    if 'shard' not in g:
+        try:
+            g.shard = shards.acquire(current_profile())
+        except KeyError:
+            session['profile'] = DEFAULT_PROFILE  # profile no longer in the catalog
+            g.shard = shards.acquire(DEFAULT_PROFILE)
+        g.shard.favorites.sync()  # pick up other workers' changes, if any
+    return g.shard
+
+def current_bank():
+    """The bank this request works with, the same one for the whole request"""
+    if 'bank' not in g:
+        g.bank = bank
+    return g.bank
+
+def current_deck():
+    """The session's quiz deck, or None when no quiz is running"""
+    if 'deck' not in g:
+        desc = session.get('quiz_deck')
+        if desc is None:
+            g.deck = None
+        else:
+            store = current_bank().snapshots.get(desc.get('v'))
+            if store is not None:
+                g.deck = Deck.from_descriptor(store, desc)
+            else:
+                # The deck's bank has been dropped. An ID deck's order comes
+                # from its IDs and seed alone, so it carries on; a domain deck
+                # would come out in a different order on the current bank, so
+                # that quiz starts over and the page is told (deck_changed)
+                # to drop its copy
+                g.deck = Deck.from_descriptor(current_bank().store, desc)
+                session['quiz_deck'] = g.deck.descriptor()
+                if g.deck.ids is None:
+                    session['current_index'] = 0
+                    g.deck_changed = True
+    return g.deck
+
+def requested_index():
+    """Quiz position a request refers to: the client's 'index' if sent, else the session's"""
+    if g.get('deck_changed'):
+        return session.get('current_index', 0)  # the client's index is for the old order
+    index = (request.get_json(silent=True) or {}).get('index')
+    if isinstance(index, int) and not isinstance(index, bool) and index >= 0:
+        return index
+    return session.get('current_index', 0)
+
+def question_payload(deck, index, answered_questions, favorites):
+    """Encoded get_question response for deck[index], or None if the question is gone"""
+    question_obj = deck[index]
+    if not question_obj:
+        return None
+    
+    # Check if this question has been answered before
+    question_id_str = str(question_obj.id)
+    previously_answered = question_id_str in answered_questions
+    
+    # Question content comes pre-encoded from payload_cache; only the
+    # per-session fields below are encoded on each request
+    response_data = {
+        'index': index,
+        'total': len(deck),
+        'is_favorite': question_obj.id in favorites,
+        'mode': session.get('quiz_mode', 'normal'),
+        'previously_answered': previously_answered
+    }
+    if g.get('deck_changed'):
+        response_data['deck_changed'] = True
+    
+    # If previously answered, include the answer and result
+    if previously_answered:
+        answer_data = answered_questions[question_id_str]
+        response_data['previous_answer'] = answer_data['answer']
+        response_data['previous_correct'] = answer_data['correct']
+        response_data['correct_answer'] = question_obj.answer
+    
+    return payload_cache.render(question_obj, response_data)
 
 def get_db():
     """Get database connection for current request"""
     if 'db' not in g:
-        g.db = sqlite3.connect(db_path)
-        g.db.row_factory = sqlite3.Row
+        g.db = get_shard().pool.acquire()
     return g.db
 
 def close_db(e=None):
-    """Close database connection"""
+    """Return the request's database connection and shard"""
     db = g.pop('db', None)
+    shard = g.pop('shard', None)
     if db is not None:
-        db.close()
+        shard.pool.release(db)
+    if shard is not None:
+        shards.release(shard)
 
 @app.teardown_appcontext
 def close_db_context(error):
     """Close database at end of request"""
     close_db()
 
-def init_app():
-    """Initialize the application"""
-    global questions_data, db_path, ollama_model
+def set_questions(store):
+    """Swap in a freshly loaded question bank"""
+    global bank
+    # Build the indexes and snapshot map first; one assignment then makes
+    # them all live together
+    snapshots = {v: s for v, s in bank.snapshots.items() if v != store.version}
+    snapshots[store.version] = store
+    for version in list(snapshots)[:-BANK_SNAPSHOTS]:
+        del snapshots[version]
+    bank = Bank(store, SearchIndex(store),
+                RelatedIndex(store) if similarity_available() else None,
+                MappingProxyType(snapshots))
+    payload_cache.clear()  # drop fragments of replaced questions
+
+def set_ollama_model(model):
+    """Called by the background model discovery once it finishes"""
+    global ollama_model
+    ollama_model = model
+
+def flush_results():
+    """Make the profile's queued answers visible before reading statistics"""
+    get_shard().flush()
+
+def ai_warming_up():
+    return ollama_discovery is not None and ollama_discovery.warming_up
+
+def ai_unavailable_response():
+    """Error response for AI endpoints when no model is (yet) available"""
+    if ai_warming_up():
+        return jsonify({'error': 'AI assistant is warming up, please try again in a moment',
+                        'warming_up': True}), 503
+    return jsonify({'error': 'AI explanations not available'}), 400
+
+def preload_app(cfg):
+    """Load the question bank and its indexes and migrate the databases.
+    
+    Starts no threads and leaves no connections open, so a pre-forking
+    server can call this once in the parent and share the result with its
+    workers copy-on-write (see serve.py).
+    """
+    global question_watcher
     
-    cfg = load_config()
     if not os.path.exists(cfg['data_dir']):
         os.makedirs(cfg['data_dir'], exist_ok=True)
         print(f'Created data directory: {cfg["data_dir"]}')
     
-    questions_data = load_questions(cfg['data_dir'])
-    print(f'Loaded {len(questions_data)} questions from {len(set(q.filepath for q in questions_data))} files')
-    
-    # Initialize database and store path for per-request connections
-    db_path = 'quiz_results.db'  # Use default path from db.py
-    db_connection = init_db(db_path)
-    db_connection.close()  # Close the initialization connection
-    
-    # Check Ollama
-    if check_ollama_status():
-        models = list_models()
-        if models:
-            ollama_model = cfg.get('ollama_model', models[0])
-            if ollama_model not in models:
-                ollama_model = models[0]
-            print(f'Using Ollama model: {ollama_model}')
-        else:
-            print('Ollama running but no models found')
-    else:
-        print('Ollama not available - explanations will be disabled')
+    question_watcher = QuestionBankWatcher(cfg['data_dir'], on_reload=set_questions,
+                                           workers=cfg.get('load_workers', 0))
+    set_questions(question_watcher.load())
+    print(f'Loaded {len(bank.store)} questions from {len(bank.store.filepaths())} files')
+    
+    # Migrate once up front rather than racing to do it in every worker
+    catalog = ProfileCatalog()
+    for path in catalog.shard_paths():
+        init_db(path).close()
+    catalog.close()
+
+def start_app(cfg, watch=True, background_jobs=True, shared=False, metrics_dir=None):
+    """Open this process's databases and start its background threads.
+    
+    watch=False leaves reloading the question bank to the caller (the
+    pre-fork master reloads by replacing workers); background_jobs=False
+    skips jobs that should only run in one process, such as compaction.
+    shared=True means other worker processes use the same databases, so
+    cached favorites are checked for their changes on every request.
+    metrics_dir is a directory the workers of one server share so that
+    /metrics on any of them reports the whole server.
+    """
+    global profile_catalog, shards, ollama_discovery, results_compactor, worker_state
+    global shared_metrics
+    
+    if metrics_dir:
+        shared_metrics = SharedMetrics(metrics_registry, metrics_dir).start()
+    
+    # Quiz state lives server-side; the cookie only holds a session ID
+    session_store = cfg.get('session_store', 'sqlite')
+    if session_store in ('sqlite', 'memory'):
+        store = SqliteSessionStore() if session_store == 'sqlite' else MemorySessionStore()
+        app.session_interface = ServerSideSessionInterface(
+            store, ttl=cfg.get('session_ttl_hours', 168) * 3600)
+    
+    reload_interval = cfg.get('reload_interval', 5)
+    if watch and reload_interval:
+        question_watcher.start(reload_interval)
+    
+    # Each profile's results live in their own database; the default profile
+    # keeps using quiz_results.db
+    profile_catalog = ProfileCatalog()
+    shards = ShardManager(profile_catalog, max_open=cfg.get('max_open_profiles', 16),
+                          write_behind=cfg.get('write_behind', False), shared=shared)
+    shards.release(shards.acquire(DEFAULT_PROFILE))  # open the default database now
+    atexit.register(shards.close_all)  # durable flush of write-behind queues on shutdown
+    
+    retention_days = cfg.get('retention_days', 0)
+    if background_jobs and retention_days:
+        results_compactor = ResultsCompactor(profile_catalog.shard_paths, retention_days,
+                                             cfg.get('compact_interval_hours', 24) * 3600).start()
+    
+    # Look for Ollama models in the background so a slow or missing Ollama
+    # does not hold up startup; AI endpoints report "warming up" meanwhile
+    ollama_discovery = ModelDiscovery(cfg.get('ollama_model', ''), on_done=set_ollama_model).start()
+    worker_state = 'ready'
+
+def stop_app():
+    """Stop background threads and flush and close the databases"""
+    global worker_state
+    worker_state = 'draining'
+    question_watcher.stop()
+    if results_compactor is not None:
+        results_compactor.stop()
+    if shards is not None:
+        shards.close_all()
+    if profile_catalog is not None:
+        profile_catalog.close()
+    if shared_metrics is not None:
+        shared_metrics.stop()
+
+def init_app():
+    """Initialize the application"""
+    cfg = load_config()
+    preload_app(cfg)
+    start_app(cfg)
 
 @app.route('/')
 def index():
     """Main page with domain selection"""
-    domains = sorted(set(q.domain for q in questions_data))
-    domain_counts = {domain: sum(1 for q in questions_data if q.domain == domain) 
-                    for domain in domains}
+    catalog = current_bank().store.catalog
+    domains = catalog.names
+    domain_counts = catalog.counts
     
     # Check if there's an active quiz session
-    has_active_quiz = 'quiz_question_ids' in session and session.get('current_index', 0) < len(session.get('quiz_question_ids', []))
+    deck = current_deck()
+    has_active_quiz = deck is not None and session.get('current_index', 0) < len(deck)
     active_quiz_info = None
     
     if has_active_quiz:
-        question_ids = session['quiz_question_ids']
         current_index = session.get('current_index', 0)
-        total_questions = len(question_ids)
+        total_questions = len(deck)
         quiz_mode = session.get('quiz_mode', 'normal')
         randomized = session.get('randomized', True)
         
@@ -104,7 +326,7 @@ def index():
     return render_template('index.html', 
                          domains=domains, 
                          domain_counts=domain_counts,
-                         total_questions=len(questions_data),
+                         total_questions=catalog.total,
                          has_active_quiz=has_active_quiz,
                          active_quiz_info=active_quiz_info)
 
@@ -113,33 +335,68 @@ def start_quiz():
     """Start a new quiz with selected domains"""
     data = request.json
     selected_domains = data.get('domains', [])
-    mode = data.get('mode', 'normal')  # normal, favorites
+    mode = data.get('mode', 'normal')  # normal, favorites, search, drill, missed, weak
     randomize = data.get('randomize', True)
     
     if not selected_domains and mode == 'normal':
         return jsonify({'error': 'Please select at least one domain'}), 400
     
-    if mode == 'favorites':
-        fav_ids = get_favorite_questions(get_db())
+    bank = current_bank()
+    if mode == 'drill':
+        if bank.related is None:
+            return jsonify({'error': 'Related questions require NumPy'}), 400
+        # Drill set: the questions most similar to one the user missed
+        try:
+            drill_size = int(data.get('k', DRILL_SIZE))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k must be a whole number'}), 400
+        drill_size = max(1, min(drill_size, MAX_DRILL_SIZE))
+        deck_ids = [q.id for q, _ in bank.related.related([str(data.get('question_id', ''))],
+                                                          k=drill_size,
+                                                          domains=selected_domains)]
+    elif mode == 'search':
+        query = data.get('query', '').strip()
+        if not query:
+            return jsonify({'error': 'Please enter a search query'}), 400
+        # Without randomization the quiz follows the search ranking; a
+        # bounded top-k keeps broad queries from scoring the whole bank
+        deck_ids = [q.id for q, _ in bank.search.search(query, limit=MAX_SEARCH_DECK,
+                                                         domains=selected_domains)]
+    elif mode == 'favorites':
+        fav_ids = get_shard().favorites.ids()
         if not fav_ids:
             return jsonify({'error': 'No favorite questions found'}), 400
-        quiz_questions = [q for q in questions_data if q.id in fav_ids]
+        deck_ids = [q.id for q in bank.store.get_many(fav_ids)]
+    elif mode in ('missed', 'weak'):
+        flush_results()  # include answers still queued for writing
+        if mode == 'missed':
+            review_ids = get_missed_questions(get_db())
+        else:
+            review_ids = get_weak_questions(get_db())
+        quiz_questions = bank.store.get_many(review_ids)
+        if selected_domains:
+            allowed = set(selected_domains)
+            quiz_questions = [q for q in quiz_questions if q.domain in allowed]
+        deck_ids = [q.id for q in quiz_questions]
     else:
-        quiz_questions = [q for q in questions_data if q.domain in selected_domains]
+        deck_ids = None  # whole domains, read lazily from the bank's indexes
     
-    if not quiz_questions:
-        return jsonify({'error': 'No questions found for selected criteria'}), 400
+    # A random seed stands in for the shuffled order; the deck computes
+    # its i-th question on demand instead of materializing a permutation
+    seed = random.getrandbits(32) if randomize else None
+    deck = Deck(bank.store, domains=selected_domains if deck_ids is None else None,
+                ids=deck_ids, seed=seed)
     
-    # Shuffle if randomization is enabled
-    if randomize:
-        random.shuffle(quiz_questions)
+    if not len(deck):
+        return jsonify({'error': 'No questions found for selected criteria'}), 400
     
     # Clear any old session data first
     session.pop('questions', None)  # Remove old full question data if exists
     session.pop('question_ids', None)  # Remove old question_ids key if exists
+    session.pop('quiz_question_ids', None)  # Superseded by quiz_deck
     
-    # Store only question IDs to avoid session cookie size limit
-    session['quiz_question_ids'] = [q.id for q in quiz_questions]
+    # Store the deck's filter and seed, not its questions
+    session['quiz_deck'] = deck.descriptor()
     session['current_index'] = 0
     session['quiz_mode'] = mode
     session['randomized'] = randomize
@@ -148,96 +405,121 @@ def start_quiz():
     
     return jsonify({
         'success': True, 
-        'total_questions': len(quiz_questions),
+        'total_questions': len(deck),
         'mode': mode,
         'randomized': randomize
     })
 
+@app.route('/api/search')
+def search():
+    """Full-text search over question text, choices and explanations"""
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_SEARCH_RESULTS))
+    domains = request.args.getlist('domain')
+    
+    results = current_bank().search.search(query, limit=limit, domains=domains)
+    return jsonify({
+        'query': query,
+        'results': [
+            {'id': q.id, 'domain': q.domain, 'text': q.text, 'score': score}
+            for q, score in results
+        ]
+    })
+
+@app.route('/api/related')
+def related():
+    """Questions most similar to the given question id"""
+    bank = current_bank()
+    if bank.related is None:
+        return jsonify({'error': 'Related questions require NumPy'}), 400
+    
+    question_id = request.args.get('id', '')
+    k = max(1, min(request.args.get('k', DRILL_SIZE, type=int), MAX_DRILL_SIZE))
+    if question_id not in bank.store:
+        return jsonify({'error': 'Question not found'}), 404
+    
+    return jsonify({
+        'id': question_id,
+        'related': [
+            {'id': q.id, 'domain': q.domain, 'text': q.text, 'similarity': score}
+            for q, score in bank.related.related([question_id], k=k)
+        ]
+    })
+
 @app.route('/quiz')
 def quiz():
     """Quiz interface"""
-    if 'quiz_question_ids' not in session:
+    if current_deck() is None:
         return redirect('/')
     
     return render_template('quiz.html', 
-                         ollama_available=bool(ollama_model))
+                         ollama_available=bool(ollama_model) or ai_warming_up(),
+                         ai_warming_up=ai_warming_up())
 
 @app.route('/api/get_question')
 def get_question():
     """Get current question"""
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
     
-    question_ids = session['quiz_question_ids']
     index = session.get('current_index', 0)
     
-    # Check if question sequence is stable
-    sequence_hash = hashlib.md5(str(question_ids).encode()).hexdigest()[:8]
-    print(f"Get question: index={index}, total={len(question_ids)}, sequence_hash={sequence_hash}")
-    
-    if index >= len(question_ids):
+    if index >= len(deck):
         return jsonify({'completed': True})
     
-    # Find the question by ID
-    current_question_id = question_ids[index]
-    print(f"Serving question ID {current_question_id} at index {index}")
-    print(f"First 5 question IDs in sequence: {question_ids[:5]}")
-    
-    question_obj = next((q for q in questions_data if q.id == current_question_id), None)
-    
-    if not question_obj:
-        return jsonify({'error': 'Question not found'}), 400
-    
-    # Convert to dict for JSON response
-    question = question_obj.__dict__
-    is_fav = is_favorite(get_db(), question['id'])
-    
-    # Check if this question has been answered before
     answered_questions = session.get('answered_questions', {})
-    question_id_str = str(question['id'])
-    previously_answered = question_id_str in answered_questions
-    
-    response_data = {
-        'question': question,
-        'index': index,
-        'total': len(question_ids),
-        'is_favorite': is_fav,
-        'mode': session.get('quiz_mode', 'normal'),
-        'previously_answered': previously_answered
-    }
+    favorites = get_shard().favorites
+    payload = question_payload(deck, index, answered_questions, favorites)
+    if payload is None:
+        return jsonify({'error': 'Question not found'}), 400
     
-    # If previously answered, include the answer and result
-    if previously_answered:
-        answer_data = answered_questions[question_id_str]
-        response_data['previous_answer'] = answer_data['answer']
-        response_data['previous_correct'] = answer_data['correct']
-        response_data['correct_answer'] = question['answer']
+    # ?window=N also returns the next N questions, each shaped like a
+    # get_question response, so the page can move ahead without a round trip
+    window = max(0, min(request.args.get('window', 0, type=int), MAX_PREFETCH))
+    if window:
+        ahead = (question_payload(deck, i, answered_questions, favorites)
+                 for i in range(index + 1, min(index + 1 + window, len(deck))))
+        payload = payload_cache.attach(payload, 'ahead', [p for p in ahead if p is not None])
     
-    return jsonify(response_data)
+    return app.response_class(payload, mimetype='application/json')
+
+@app.route('/metrics')
+def metrics():
+    """Request, Ollama and SQLite timings in the Prometheus text format"""
+    text = shared_metrics.render() if shared_metrics is not None else metrics_registry.render()
+    return Response(text, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/payload_cache_stats')
+def payload_cache_stats():
+    """Hit/miss counters for the pre-encoded question payload cache"""
+    return jsonify(payload_cache.stats())
 
 @app.route('/api/submit_answer', methods=['POST'])
 def submit_answer():
     """Submit an answer"""
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
+    if g.get('deck_changed'):
+        # The answer is for a question in the old order; don't grade another one
+        return jsonify({'error': 'The question bank changed, so the quiz starts over',
+                        'deck_changed': True}), 409
     
     data = request.json
     user_answer = data.get('answer')
     
-    question_ids = session['quiz_question_ids']
-    index = session.get('current_index', 0)
+    index = requested_index()
     
-    if index >= len(question_ids):
+    if index >= len(deck):
         return jsonify({'error': 'Quiz completed'}), 400
     
-    # Find the question by ID
-    current_question_id = question_ids[index]
-    question_obj = next((q for q in questions_data if q.id == current_question_id), None)
+    question_obj = deck[index]
     
     if not question_obj:
         return jsonify({'error': 'Question not found'}), 400
     
-    question = question_obj.__dict__
+    question = question_obj.to_dict()
     correct_answer = question['answer']
     
     # Check if answer is correct
@@ -246,10 +528,22 @@ def submit_answer():
     else:  # ordering
         correct = (user_answer == correct_answer)
     
-    # Save result
-    save_result(get_db(), question['id'], 
-               json.dumps(user_answer), json.dumps(correct_answer), 
-               correct, question['domain'])
+    # Save result (queued for a batched commit when write-behind is enabled)
+    queued = False
+    writer = get_shard().writer
+    if writer is not None:
+        try:
+            writer.submit(question['id'], json.dumps(user_answer), json.dumps(correct_answer),
+                          correct, question['domain'], timeout=SUBMIT_TIMEOUT)
+            queued = True
+        except queue.Full:
+            print('Write-behind queue is full; saving the answer directly')
+        except RuntimeError as e:
+            print(f'Write-behind unavailable ({e}); saving the answer directly')
+    if not queued:
+        save_result(get_db(), question['id'], 
+                   json.dumps(user_answer), json.dumps(correct_answer), 
+                   correct, question['domain'])
     
     # Store user answer for AI explanation
     session['last_user_answer'] = user_answer
@@ -267,61 +561,72 @@ def submit_answer():
     # Move to next question after submitting answer
     session['current_index'] = index + 1
     
-    return jsonify({
+    response_data = {
         'correct': correct,
         'correct_answer': correct_answer,
         'explanation': question.get('explanation', ''),
-        'next_available': index + 1 < len(question_ids)
-    })
+        'next_available': index + 1 < len(deck)
+    }
+    
+    # Offer the closest related questions right away for a wrong answer
+    related_index = current_bank().related
+    if not correct and related_index is not None:
+        response_data['question_id'] = question['id']
+        response_data['related'] = [
+            {'id': q.id, 'domain': q.domain, 'text': q.text}
+            for q, _ in related_index.related([question['id']], k=RELATED_PREVIEW)
+        ]
+    
+    return jsonify(response_data)
 
 @app.route('/api/toggle_favorite', methods=['POST'])
 def toggle_favorite():
     """Toggle favorite status of current question"""
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
     
-    question_ids = session['quiz_question_ids']
-    index = session.get('current_index', 0)
+    index = requested_index()
     
-    if index >= len(question_ids):
+    if index >= len(deck):
         return jsonify({'error': 'No current question'}), 400
     
-    # Find the question by ID
-    current_question_id = question_ids[index]
-    question_obj = next((q for q in questions_data if q.id == current_question_id), None)
+    question_obj = deck[index]
     
     if not question_obj:
         return jsonify({'error': 'Question not found'}), 400
     
-    question = question_obj.__dict__
-    current_fav = is_favorite(get_db(), question['id'])
-    mark_favorite(get_db(), question['id'], not current_fav)
+    favorites = get_shard().favorites
+    is_fav = question_obj.id not in favorites
+    delta = favorites.set(get_db(), question_obj.id, is_fav)
     
-    return jsonify({'is_favorite': not current_fav})
+    return jsonify({
+        'is_favorite': is_fav,
+        'favorite_count': len(favorites),
+        'delta': delta,
+    })
 
 @app.route('/api/get_explanation', methods=['POST'])
 def get_explanation():
     """Get AI explanation for current question"""
     if not ollama_model:
-        return jsonify({'error': 'AI explanations not available'}), 400
+        return ai_unavailable_response()
     
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
     
-    question_ids = session['quiz_question_ids']
-    index = session.get('current_index', 0)
+    index = requested_index()
     
-    if index >= len(question_ids):
+    if index >= len(deck):
         return jsonify({'error': 'No current question'}), 400
     
-    # Find the question by ID
-    current_question_id = question_ids[index]
-    question_obj = next((q for q in questions_data if q.id == current_question_id), None)
+    question_obj = deck[index]
     
     if not question_obj:
         return jsonify({'error': 'Question not found'}), 400
     
-    question = question_obj.__dict__
+    question = question_obj.to_dict()
     
     # Get user's answer from session
     user_answer = session.get('last_user_answer', 'Unknown')
@@ -375,25 +680,23 @@ def get_explanation():
 def explain_question():
     """Get AI explanation of what the question is asking"""
     if not ollama_model:
-        return jsonify({'error': 'AI explanations not available'}), 400
+        return ai_unavailable_response()
     
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
     
-    question_ids = session['quiz_question_ids']
-    index = session.get('current_index', 0)
+    index = requested_index()
     
-    if index >= len(question_ids):
+    if index >= len(deck):
         return jsonify({'error': 'No current question'}), 400
     
-    # Find the question by ID
-    current_question_id = question_ids[index]
-    question_obj = next((q for q in questions_data if q.id == current_question_id), None)
+    question_obj = deck[index]
     
     if not question_obj:
         return jsonify({'error': 'Question not found'}), 400
     
-    question = question_obj.__dict__
+    question = question_obj.to_dict()
     
     prompt = (
         "You are a CISSP expert tutor. Help the student understand what this cybersecurity question is asking.\n\n"
@@ -418,17 +721,99 @@ def explain_question():
     except Exception as e:
         return jsonify({'error': f'Failed to explain question: {str(e)}'}), 500
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 while this process takes requests, 503 while starting or draining"""
+    status = {
+        'status': worker_state,
+        'pid': os.getpid(),
+        'questions': len(bank.store),
+        'bank_version': bank.store.version,
+    }
+    return jsonify(status), 200 if worker_state == 'ready' else 503
+
+@app.route('/api/ai_status')
+def ai_status():
+    """Report whether background Ollama discovery has finished"""
+    status = ollama_discovery.status if ollama_discovery else 'unavailable'
+    return jsonify({'status': status, 'model': ollama_model})
+
 @app.route('/statistics')
 def statistics():
     """Statistics page"""
+    flush_results()
     stats = get_results_summary(get_db())
     return render_template('statistics.html', stats=stats)
 
+@app.route('/api/stats/trend')
+def stats_trend():
+    """Accuracy per day or week per domain; days=0 covers all history"""
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in ('day', 'week'):
+        return jsonify({'error': 'bucket must be "day" or "week"'}), 400
+    days = request.args.get('days', 90, type=int)
+    if days < 0:
+        # 0 already means all history; a typo must not silently become that
+        return jsonify({'error': 'days must be 0 (all history) or a positive number'}), 400
+    days = min(days, MAX_TREND_DAYS)
+    points = request.args.get('points', type=int)
+    if points is not None:
+        points = max(1, min(points, MAX_TREND_POINTS))
+    
+    flush_results()
+    trend = get_trend(get_db(), bucket, days=days or None, points=points)
+    domains = request.args.getlist('domain')
+    if domains:
+        trend['domains'] = {d: s for d, s in trend['domains'].items() if d in domains}
+    return jsonify(trend)
+
+@app.route('/api/profiles', methods=['GET', 'POST'])
+def profiles():
+    """List profiles, or create and/or switch to one by name"""
+    if request.method == 'POST':
+        name = str((request.json or {}).get('name', '')).strip()
+        try:
+            profile_catalog.create(name)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        session['profile'] = name
+        # Quiz progress belongs to the previous profile
+        for key in ('quiz_deck', 'current_index', 'answered_questions'):
+            session.pop(key, None)
+    return jsonify({'profiles': profile_catalog.names(), 'current': current_profile()})
+
+@app.route('/api/export/<dataset>')
+def export_data(dataset):
+    """Stream results, domain totals or question mastery as CSV or JSONL"""
+    fmt = request.args.get('format', 'csv')
+    if dataset not in DATASETS or fmt not in FORMATS:
+        return jsonify({'error': f'Export one of {sorted(DATASETS)} as one of {list(FORMATS)}'}), 404
+    
+    flush_results()
+    
+    profile = current_profile()
+    
+    def generate():
+        # Own shard and connection: the response outlives the request's
+        shard = shards.acquire(profile)
+        conn = shard.pool.acquire()
+        try:
+            yield from iter_export(conn, dataset, fmt)
+        finally:
+            shard.pool.release(conn)
+            shards.release(shard)
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f'quiz_{dataset}_{datetime.now():%Y%m%d}.{fmt}'
+    return Response(generate(), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @app.route('/api/reset_statistics', methods=['POST'])
 def reset_statistics():
     """Reset all statistics"""
     try:
         from quiz_app.db import clear_all_statistics
+        flush_results()  # don't let queued answers land after the reset
         rows_deleted = clear_all_statistics(get_db())
         return jsonify({
             'success': True, 
@@ -441,11 +826,11 @@ def reset_statistics():
 @app.route('/api/previous_question', methods=['POST'])
 def previous_question():
     """Go to previous question"""
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
     
-    current_index = session.get('current_index', 0)
-    question_ids = session['quiz_question_ids']
+    current_index = min(requested_index(), len(deck))
     
     if current_index > 0:
         new_index = current_index - 1
@@ -457,28 +842,22 @@ def previous_question():
 @app.route('/api/next_question', methods=['POST'])
 def next_question():
     """Go to next question without submitting an answer"""
-    if 'quiz_question_ids' not in session:
+    deck = current_deck()
+    if deck is None:
         return jsonify({'error': 'No active quiz'}), 400
     
-    question_ids = session['quiz_question_ids']
-    current_index = session.get('current_index', 0)
-    
-    print(f"Next question: current_index={current_index}, total_questions={len(question_ids)}")
+    current_index = requested_index()
     
-    if current_index + 1 < len(question_ids):
-        new_index = current_index + 1
-        session['current_index'] = new_index
-        print(f"Moving to next question: index {current_index} -> {new_index}")
-        print(f"Question ID sequence around current position: {question_ids[max(0, new_index-1):new_index+3]}")
+    if current_index + 1 < len(deck):
+        session['current_index'] = current_index + 1
         return jsonify({'success': True})
     else:
-        print("Quiz completed")
         return jsonify({'completed': True})
 
 @app.route('/api/clear_session', methods=['POST'])
 def clear_session():
     """Clear the current quiz session"""
-    session.pop('quiz_question_ids', None)
+    session.pop('quiz_deck', None)
     session.pop('current_index', None)
     session.pop('quiz_mode', None)
     session.pop('randomized', None)
@@ -4,7 +4,17 @@ import os
 CONFIG_FILE = 'quiz_config.json'
 DEFAULT_CONFIG = {
     'data_dir': 'data',
-    'ollama_model': 'llama3.2:3b'
+    'ollama_model': 'llama3.2:3b',
+    'load_workers': 0,
+    'reload_interval': 5,
+    'write_behind': False,
+    'retention_days': 0,
+    'compact_interval_hours': 24,
+    'max_open_profiles': 16,
+    'session_store': 'sqlite',
+    'session_ttl_hours': 168,
+    'workers': 0,
+    'graceful_timeout': 30
 }
 
 
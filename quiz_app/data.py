@@ -1,76 +1,528 @@
+import hashlib
 import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Any
+from types import MappingProxyType
+from typing import List, Any, Dict, FrozenSet, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
 
-@dataclass
 class Question:
-    id: str
-    domain: str
-    type: str  # 'mcq' or 'ordering'
-    text: str
-    choices: List[str]
-    answer: Any
-    explanation: str = ''
-    filepath: str = ''
+    """A single quiz question.
 
+    Questions are slotted (no per-instance __dict__), keep choices in a
+    tuple and intern the strings that repeat across the bank (domain, type
+    and filepath), so thousands of them can stay resident cheaply.
+    """
+    __slots__ = ('id', 'domain', 'type', 'text', 'choices', 'answer',
+                 'explanation', 'filepath')
 
+    def __init__(self, id: str, domain: str, type: str, text: str,
+                 choices: Sequence[str], answer: Any,
+                 explanation: str = '', filepath: str = ''):
+        self.id = id
+        # Coerced first: sys.intern() only takes str, and a null or numeric
+        # field in one entry must not fail the whole file
+        self.domain = sys.intern(str(domain or ''))
+        self.type = sys.intern(str(type or ''))  # 'mcq' or 'ordering'
+        self.text = text
+        self.choices = tuple(choices or ())
+        self.answer = answer
+        self.explanation = explanation
+        self.filepath = sys.intern(str(filepath or ''))
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the question as a plain dict (choices as a list)"""
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d['choices'] = list(self.choices)
+        return d
 
-def load_questions(folder: str) -> List[Question]:
-    """Load all questions from JSON files in folder and from quiz.json in root."""
-    questions = []
-    
-    # Load from quiz.json in root directory first (if exists)
-    quiz_json_path = 'quiz.json'
-    if os.path.exists(quiz_json_path):
-        print(f'Loading questions from {quiz_json_path}')
-        with open(quiz_json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            for i, q in enumerate(data):
-                # Convert quiz.json format to our format
-                if 'options' in q:
-                    choices = [q['options'][key] for key in ['A', 'B', 'C', 'D'] if key in q['options']]
-                    correct_answer = q['options'].get(q.get('correct_answer', ''), q.get('correct_answer', ''))
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self):
+        return f'Question(id={self.id!r}, domain={self.domain!r}, type={self.type!r})'
+
+
+def memory_report(questions: Iterable[Question]) -> Dict[str, Any]:
+    """Measure the resident size of a question bank.
+
+    Every object reachable from the questions is counted once, so shared
+    (interned) strings are only paid for a single time.
+    """
+    seen = set()
+    total = 0
+    count = 0
+
+    def add(obj):
+        nonlocal total
+        if id(obj) in seen:
+            return
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (list, tuple)):
+            for item in obj:
+                add(item)
+        elif isinstance(obj, dict):
+            for key, value in obj.items():
+                add(key)
+                add(value)
+
+    for q in questions:
+        count += 1
+        add(q)
+        for name in Question.__slots__:
+            add(getattr(q, name))
+
+    return {
+        'questions': count,
+        'total_bytes': total,
+        'bytes_per_question': round(total / count, 1) if count else 0.0,
+    }
+
+
+def _id_sort_key(question_id: str) -> Tuple[int, Any]:
+    """Sort numeric ids numerically and everything else lexically after them"""
+    if question_id.isdigit():
+        return (0, int(question_id))
+    return (1, question_id)
+
+
+@dataclass(frozen=True)
+class DomainInfo:
+    name: str
+    count: int
+    types: Mapping[str, int]  # question type -> count
+    first_id: str
+    last_id: str
+
+
+@dataclass(frozen=True)
+class DomainCatalog:
+    """Immutable per-domain summary of a question bank.
+
+    Built once when a QuestionStore is created; a changed bank gets a new
+    store and therefore a new catalog.
+    """
+    domains: Tuple[DomainInfo, ...] = ()  # sorted by name
+    total: int = 0
+    _by_name: Mapping[str, DomainInfo] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_by_name',
+                           MappingProxyType({d.name: d for d in self.domains}))
+
+    @classmethod
+    def build(cls, questions: Iterable[Question]) -> 'DomainCatalog':
+        types: Dict[str, Dict[str, int]] = {}
+        ids: Dict[str, List[str]] = {}
+        total = 0
+        for q in questions:
+            total += 1
+            domain_types = types.setdefault(q.domain, {})
+            domain_types[q.type] = domain_types.get(q.type, 0) + 1
+            ids.setdefault(q.domain, []).append(q.id)
+
+        infos = tuple(
+            DomainInfo(
+                name=name,
+                count=len(ids[name]),
+                types=MappingProxyType(types[name]),
+                first_id=min(ids[name], key=_id_sort_key),
+                last_id=max(ids[name], key=_id_sort_key),
+            )
+            for name in sorted(ids)
+        )
+        return cls(domains=infos, total=total)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return {d.name: d.count for d in self.domains}
+
+    def get(self, name: str) -> Optional[DomainInfo]:
+        return self._by_name.get(name)
+
+
+class QuestionStore:
+    """Question bank with hash indexes by id, domain and type.
+
+    Iterating the store yields questions in load order, so existing code that
+    treats the bank as a list keeps working. When two files define the same
+    id, the first one loaded wins, matching the old linear-scan lookup.
+    """
+
+    def __init__(self, questions: Iterable[Question] = ()):
+        self._questions: List[Question] = list(questions)
+        self._by_id: Dict[str, Question] = {}
+        # Secondary indexes hold positions into _questions so that merged
+        # lookups can be returned in load order.
+        self._by_domain: Dict[str, List[int]] = {}
+        self._by_type: Dict[str, List[int]] = {}
+        for pos, q in enumerate(self._questions):
+            self._by_id.setdefault(q.id, q)
+            self._by_domain.setdefault(q.domain, []).append(pos)
+            self._by_type.setdefault(q.type, []).append(pos)
+        # Each domain as runs of consecutive positions, (start, stop), so a
+        # domain filter can be walked in load order without listing positions
+        self._domain_runs: Dict[str, List[Tuple[int, int]]] = {}
+        for domain, positions in self._by_domain.items():
+            runs = self._domain_runs[domain] = []
+            for pos in positions:
+                if runs and runs[-1][1] == pos:
+                    runs[-1] = (runs[-1][0], pos + 1)
                 else:
-                    choices = q.get('choices', [])
-                    correct_answer = q.get('answer', q.get('correct_answer', ''))
-                
-                question_text = q.get('question_text', q.get('question', q.get('text', '')))
-                
-                question = Question(
-                    id=str(q.get('question_number', i + 1)),
-                    domain=q.get('domain', 'CISSP General'),
-                    type=q.get('type', 'mcq'),
-                    text=question_text,
-                    choices=choices,
-                    answer=correct_answer,
-                    explanation=q.get('explanation', ''),
-                    filepath=quiz_json_path
-                )
-                questions.append(question)
-    
-    # Also load from data folder (existing format)
+                    runs.append((pos, pos + 1))
+        # Merged runs and their cumulative offsets per domain set, built on
+        # first use; keys only hold known domains, so this stays small
+        self._runs_by_domains: Dict[FrozenSet[str], Tuple[Tuple[Tuple[int, int], ...], Tuple[int, ...]]] = {}
+        self.catalog = DomainCatalog.build(self._questions)
+        # Identifies this exact bank (ids, domains and order), e.g. so a
+        # stored quiz deck can tell whether the bank changed under it
+        digest = hashlib.blake2b(digest_size=6)
+        for q in self._questions:
+            digest.update(f'{q.id}\x1f{q.domain}\x1e'.encode('utf-8'))
+        self.version = digest.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def __iter__(self) -> Iterator[Question]:
+        return iter(self._questions)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._by_id
+
+    def get(self, question_id: str) -> Optional[Question]:
+        """Return the question with the given id, or None"""
+        return self._by_id.get(question_id)
+
+    def at(self, position: int) -> Question:
+        """Return the question at a load-order position"""
+        return self._questions[position]
+
+    def domain_runs(self, domain: str) -> List[Tuple[int, int]]:
+        """A domain's load-order positions as (start, stop) ranges"""
+        return list(self._domain_runs.get(domain, ()))
+
+    def runs_for(self, domains: Iterable[str]) -> Tuple[Tuple[Tuple[int, int], ...], Tuple[int, ...]]:
+        """Load-order runs of several domains merged, and offsets[i] = questions before run i
+
+        offsets has one more entry than runs; its last entry is the total.
+        Results are shared, so every deck over the same domains reuses them.
+        """
+        key = frozenset(d for d in domains if d in self._domain_runs)
+        cached = self._runs_by_domains.get(key)
+        if cached is None:
+            runs = tuple(sorted(run for d in key for run in self._domain_runs[d]))
+            offsets = [0]
+            for start, stop in runs:
+                offsets.append(offsets[-1] + stop - start)
+            cached = self._runs_by_domains[key] = (runs, tuple(offsets))
+        return cached
+
+    def get_many(self, question_ids: Iterable[str]) -> List[Question]:
+        """Return questions for the given ids, skipping unknown ones"""
+        by_id = self._by_id
+        return [by_id[qid] for qid in question_ids if qid in by_id]
+
+    def domains(self) -> List[str]:
+        """Return domain names in sorted order"""
+        return list(self.catalog.names)
+
+    def types(self) -> List[str]:
+        return list(self._by_type)
+
+    def by_domain(self, domain: str) -> List[Question]:
+        return [self._questions[pos] for pos in self._by_domain.get(domain, [])]
+
+    def by_type(self, question_type: str) -> List[Question]:
+        return [self._questions[pos] for pos in self._by_type.get(question_type, [])]
+
+    def by_domains(self, domains: Iterable[str]) -> List[Question]:
+        """Return questions from any of the given domains, in load order"""
+        positions: List[int] = []
+        for domain in set(domains):
+            positions.extend(self._by_domain.get(domain, []))
+        positions.sort()
+        return [self._questions[pos] for pos in positions]
+
+    def filepaths(self) -> List[str]:
+        return list(dict.fromkeys(q.filepath for q in self._questions))
+
+
+QUIZ_JSON_PATH = 'quiz.json'
+
+# Bump whenever the parsers or the Question record layout change so stale
+# cache files are ignored instead of being loaded with the wrong shape.
+CACHE_VERSION = 3
+CACHE_SUFFIX = '.cache'
+
+
+def parse_quiz_json(data: List[dict], path: str) -> List[Question]:
+    """Convert quiz.json entries (question_text/options format) to Questions"""
+    questions = []
+    for i, q in enumerate(data):
+        # Convert quiz.json format to our format
+        if 'options' in q:
+            choices = [q['options'][key] for key in ['A', 'B', 'C', 'D'] if key in q['options']]
+            correct_answer = q['options'].get(q.get('correct_answer', ''), q.get('correct_answer', ''))
+        else:
+            choices = q.get('choices', [])
+            correct_answer = q.get('answer', q.get('correct_answer', ''))
+
+        question_text = q.get('question_text', q.get('question', q.get('text', '')))
+
+        questions.append(Question(
+            id=str(q.get('question_number', i + 1)),
+            domain=q.get('domain', 'CISSP General'),
+            type=q.get('type', 'mcq'),
+            text=question_text,
+            choices=choices,
+            answer=correct_answer,
+            explanation=q.get('explanation', ''),
+            filepath=path
+        ))
+    return questions
+
+
+def parse_question_pack(data: Any, path: str) -> List[Question]:
+    """Convert a data_dir question file (list or {"questions": [...]}) to Questions"""
+    name = os.path.basename(path)
+    if isinstance(data, dict) and 'questions' in data:
+        items = data['questions']
+    else:
+        items = data
+    questions = []
+    for i, q in enumerate(items):
+        questions.append(Question(
+            id=str(q.get('id', f"{name}_{i+1}")),
+            domain=q.get('domain', 'Unknown'),
+            type=q.get('type', 'mcq'),
+            text=q.get('question', q.get('text', '')),
+            choices=q.get('choices', []),
+            answer=q.get('answer'),
+            explanation=q.get('explanation', ''),
+            filepath=path
+        ))
+    return questions
+
+
+def _cache_key(path: str, raw: bytes, st: os.stat_result) -> Dict[str, Any]:
+    return {
+        'version': CACHE_VERSION,
+        'path': os.path.abspath(path),
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'sha256': hashlib.sha256(raw).hexdigest(),
+    }
+
+
+def _read_cache(cache_path: str, key: Dict[str, Any]) -> Optional[list]:
+    """Return cached question records if the cache matches key, else None"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f'Ignoring unreadable parse cache {cache_path}: {e}')
+        return None
+    if not isinstance(cached, dict) or cached.get('key') != key:
+        return None
+    records = cached.get('records')
+    if not isinstance(records, list) or not all(
+            isinstance(r, list) and len(r) == CACHE_RECORD_FIELDS for r in records):
+        return None
+    return records
+
+
+def _question_record(q: Question) -> tuple:
+    """Flatten a Question into its constructor arguments (JSON-serializable, compact)"""
+    return (q.id, q.domain, q.type, q.text, q.choices, q.answer, q.explanation, q.filepath)
+
+
+def _cache_record(q: Question) -> list:
+    """_question_record() plus the index of the choice that is the answer (-1 if none)
+
+    JSON cannot say that the answer and its choice are one string, so the
+    answer is stored as an index and the choice object is reused on load,
+    keeping a cached bank as small in memory as a freshly parsed one.
+    """
+    record = list(_question_record(q))
+    index = next((i for i, c in enumerate(q.choices) if c is q.answer or c == q.answer), -1)
+    if index >= 0:
+        record[5] = None
+    record.append(index)
+    return record
+
+
+def _question_from_cache(record: list) -> Question:
+    *fields, index = record
+    if isinstance(index, int) and 0 <= index < len(fields[4]):
+        fields[5] = fields[4][index]
+    return Question(*fields)
+
+
+CACHE_RECORD_FIELDS = 9  # length of a _cache_record()
+
+
+def _write_cache(cache_path: str, key: Dict[str, Any], questions: List[Question]) -> None:
+    records = [_cache_record(q) for q in questions]
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        # Plain JSON, never pickle: a cache file someone else can write must
+        # not be able to run code when it is loaded
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'records': records}, f, ensure_ascii=False,
+                      separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # A read-only checkout just means every start takes the JSON path
+        print(f'Could not write parse cache {cache_path}: {e}')
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_quiz_json(path: str = QUIZ_JSON_PATH, use_cache: bool = True) -> List[Question]:
+    """Load quiz.json, going through the on-disk parse cache when possible.
+
+    The cache lives next to the source file (quiz.json.cache) and is keyed by
+    the source path, mtime, size and SHA-256 of its contents. On a hit the
+    pre-normalized records are read back directly; on a miss the JSON is
+    parsed as usual and the cache is rewritten.
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        raw = f.read()
+    cache_path = path + CACHE_SUFFIX
+    key = _cache_key(path, raw, st)
+
+    if use_cache:
+        records = _read_cache(cache_path, key)
+        if records is not None:
+            return [_question_from_cache(record) for record in records]
+
+    questions = parse_quiz_json(json.loads(raw.decode('utf-8')), path)
+    if use_cache:
+        _write_cache(cache_path, key, questions)
+    return questions
+
+
+@dataclass
+class FileLoadResult:
+    """Outcome of loading a single data_dir file"""
+    path: str
+    count: int = 0
+    seconds: float = 0.0
+    error: str = ''
+
+
+def load_pack_file(path: str) -> Tuple[FileLoadResult, List[tuple]]:
+    """Parse one question pack; runs inside a worker process.
+
+    Errors are returned rather than raised so one malformed file does not
+    abort the whole load.
+    """
+    start = time.perf_counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            questions = parse_question_pack(json.load(f), path)
+    except Exception as e:
+        return FileLoadResult(path, seconds=time.perf_counter() - start,
+                              error=f'{type(e).__name__}: {e}'), []
+    records = [_question_record(q) for q in questions]
+    return FileLoadResult(path, len(records), time.perf_counter() - start), records
+
+
+def find_pack_files(folder: str) -> List[str]:
+    paths = []
     for root, _, files in os.walk(folder):
         for name in files:
             if name.endswith('.json'):
-                path = os.path.join(root, name)
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and 'questions' in data:
-                        items = data['questions']
-                    else:
-                        items = data
-                    for i, q in enumerate(items):
-                        question = Question(
-                            id=str(q.get('id', f"{name}_{i+1}")),
-                            domain=q.get('domain', 'Unknown'),
-                            type=q.get('type', 'mcq'),
-                            text=q.get('question', q.get('text', '')),
-                            choices=q.get('choices', []),
-                            answer=q.get('answer'),
-                            explanation=q.get('explanation', ''),
-                            filepath=path
-                        )
-                        questions.append(question)
-    return questions
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def iter_question_packs(folder: str, workers: int = 0,
+                        file_results: Optional[List[FileLoadResult]] = None) -> Iterator[Question]:
+    """Stream questions from every JSON file under folder.
+
+    With workers > 1 the files are parsed in a process pool and questions
+    are yielded file by file as results arrive (in walk order, so duplicate
+    ids resolve the same way as a sequential load). A FileLoadResult for
+    every file, including failed ones, is appended to file_results.
+    """
+    paths = find_pack_files(folder)
+    if workers > 1 and len(paths) > 1:
+        workers = min(workers, len(paths))
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, len(paths) // (workers * 4))
+        outcomes = executor.map(load_pack_file, paths, chunksize=chunksize)
+    else:
+        executor = None
+        outcomes = map(load_pack_file, paths)
+
+    try:
+        for result, records in outcomes:
+            if file_results is not None:
+                file_results.append(result)  # the caller reports errors
+            elif result.error:
+                print(f'Skipping {result.path}: {result.error}')
+            if result.error:
+                continue
+            for record in records:
+                yield Question(*record)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def report_file_results(file_results: List[FileLoadResult], slowest: int = 3) -> None:
+    """Print a summary of a data_dir load: file count, total time, slowest files and failures"""
+    if not file_results:
+        return
+    failed = [r for r in file_results if r.error]
+    total = sum(r.seconds for r in file_results)
+    print(f'Parsed {len(file_results)} data files ({len(failed)} failed), '
+          f'{total * 1000:.1f} ms of parsing in total')
+    for r in sorted(file_results, key=lambda r: r.seconds, reverse=True)[:slowest]:
+        print(f'  {r.seconds * 1000:7.1f} ms  {r.count:5d} questions  {r.path}')
+    for r in failed:
+        print(f'  failed: {r.path}: {r.error}')
+
+
+def load_questions(folder: str, use_cache: bool = True, workers: int = 0,
+                   file_results: Optional[List[FileLoadResult]] = None) -> QuestionStore:
+    """Load all questions from JSON files in folder and from quiz.json in root.
+
+    workers > 1 parses the data folder in a process pool (see
+    iter_question_packs); per-file timings and errors go to file_results.
+    """
+    questions = []
+
+    # Load from quiz.json in root directory first (if exists)
+    if os.path.exists(QUIZ_JSON_PATH):
+        print(f'Loading questions from {QUIZ_JSON_PATH}')
+        questions.extend(load_quiz_json(QUIZ_JSON_PATH, use_cache=use_cache))
+
+    # Also load from data folder (existing format)
+    questions.extend(iter_question_packs(folder, workers, file_results))
+    return QuestionStore(questions)
+
+
+if __name__ == '__main__':
+    from .config import load_config
+
+    store = load_questions(load_config()['data_dir'])
+    report = memory_report(store)
+    print(f"{report['questions']} questions, {report['total_bytes']} bytes "
+          f"({report['bytes_per_question']} bytes/question)")
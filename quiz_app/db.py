@@ -1,13 +1,143 @@
+import queue
+import re
 import sqlite3
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Callable, Tuple, Union
+
+from .metrics import sqlite_duration
 
 DB_PATH = 'quiz_results.db'
+DAY_MS = 24 * 60 * 60 * 1000
+WEEK_ORIGIN_MS = 4 * DAY_MS  # 1970-01-05, a Monday; weeks are counted from here
+WEAK_STREAK = 2  # correct answers in a row before a question stops counting as weak
 
+# Applied to every connection. WAL lets the statistics page read while
+# answers are being written; synchronous=NORMAL is safe in WAL mode (a power
+# loss can drop the last commits but never corrupts the database).
+PRAGMAS = (
+    # Must come first: it only takes effect on a new, empty database. Older
+    # databases are switched over by the first compact_results() VACUUM.
+    ('auto_vacuum', 'INCREMENTAL'),
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),          # negative = KiB, i.e. 16 MB page cache
+    ('mmap_size', 64 * 1024 * 1024),
+    ('busy_timeout', 5000),          # ms to wait for a lock instead of failing
+    ('temp_store', 'MEMORY'),
+)
 
-def init_db(path: str = DB_PATH) -> sqlite3.Connection:
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
+
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?\w+\s+ON)\s+'
+                       r'(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def _statement_labels(sql: str) -> Tuple[str, str]:
+    """Metric labels for a statement: its verb and the first table it names"""
+    words = sql.split(None, 1)
+    match = _TABLE_RE.search(sql)
+    return (words[0].upper() if words else '', match.group(1) if match else '')
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records how long each statement takes to execute"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            sqlite_duration.observe(time.perf_counter() - start, *_statement_labels(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            sqlite_duration.observe(time.perf_counter() - start, *_statement_labels(sql))
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            sqlite_duration.observe(time.perf_counter() - start, 'SCRIPT', '')
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose statements, direct or through cursors, are timed by TimedCursor"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect(path: str = DB_PATH, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection with the standard pragmas applied"""
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread, factory=TimedConnection)
+    for name, value in PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+class ConnectionPool:
+    """Reusable SQLite connections for request handlers.
+
+    A worker thread acquires a connection for the duration of a request and
+    releases it afterwards; the connection then serves the next request on
+    whichever thread asks, so connection setup (open + pragmas) is paid once
+    per connection instead of once per request. At most max_idle connections
+    are kept open while idle.
+    """
+
+    def __init__(self, path: str = DB_PATH, max_idle: int = 8,
+                 row_factory: Optional[Any] = sqlite3.Row):
+        self.path = path
+        self.max_idle = max_idle
+        self.row_factory = row_factory
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()  # most recently used: warmest cache
+        # Connections move between threads, but only one uses it at a time
+        conn = connect(self.path, check_same_thread=False)
+        conn.row_factory = self.row_factory
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()  # never hand out a connection mid-transaction
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self) -> None:
+        """Close idle connections; ones still checked out are closed when released"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _create_base_tables(cur: sqlite3.Cursor) -> None:
     cur.execute(
         """CREATE TABLE IF NOT EXISTS results (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,21 +154,485 @@ def init_db(path: str = DB_PATH) -> sqlite3.Connection:
             question_id TEXT PRIMARY KEY
         )"""
     )
-    conn.commit()
-    return conn
 
 
-def save_result(conn: sqlite3.Connection, question_id: str, user_answer: str,
-                correct_answer: str, correct: bool, domain: str) -> None:
-    cur = conn.cursor()
+def _rebuild_domain_stats(cur: sqlite3.Cursor) -> None:
+    cur.execute('DELETE FROM domain_stats')
+    cur.execute(
+        """INSERT INTO domain_stats (domain, attempts, correct)
+           SELECT COALESCE(domain, ''), COUNT(*), COALESCE(SUM(correct), 0)
+           FROM results GROUP BY COALESCE(domain, '')"""
+    )
+
+
+def _rebuild_question_mastery(cur: sqlite3.Cursor, seed: Optional[Dict[str, list]] = None) -> None:
+    """Replay every result in insertion order to recompute per-question mastery"""
+    mastery: Dict[str, list] = seed or {}
+    cur.execute('SELECT question_id, user_answer, correct, domain, timestamp FROM results ORDER BY id')
+    for question_id, user_answer, correct, domain, timestamp in cur.fetchall():
+        row = mastery.get(question_id)
+        if row is None:
+            row = mastery[question_id] = [question_id, '', 0, 0, 0, 0, None, None]
+        correct = int(bool(correct))
+        row[1] = domain or ''
+        row[2] += 1
+        row[3] += correct
+        row[4] = row[4] + 1 if correct else 0
+        row[5:] = [correct, user_answer, timestamp]
+    cur.execute('DELETE FROM question_mastery')
+    cur.executemany(
+        """INSERT INTO question_mastery
+               (question_id, domain, attempts, correct, streak, last_correct, last_answer, last_seen)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        mastery.values()
+    )
+
+
+def _epoch_ms_sql(column: str) -> str:
+    """SQL converting an ISO-8601 UTC text column to epoch milliseconds"""
+    return (f"CAST(strftime('%s', {column}) AS INTEGER) * 1000"
+            f" + CAST(substr(strftime('%f', {column}), 4) AS INTEGER)")
+
+
+def _integer_timestamps(cur: sqlite3.Cursor) -> None:
+    """Rebuild every table holding a time with INTEGER epoch-millisecond columns.
+
+    SQLite cannot change a column's type in place, so each table is copied
+    into a new one, dropped and the copy renamed; indexes are recreated.
+    """
     cur.execute(
+        """CREATE TABLE results_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id TEXT,
+            user_answer TEXT,
+            correct_answer TEXT,
+            correct INTEGER,
+            domain TEXT,
+            timestamp INTEGER
+        )"""
+    )
+    cur.execute(
+        f"""INSERT INTO results_new
+            SELECT id, question_id, user_answer, correct_answer, correct, domain,
+                   {_epoch_ms_sql('timestamp')}
+            FROM results"""
+    )
+    cur.execute(
+        """CREATE TABLE question_mastery_new (
+            question_id TEXT PRIMARY KEY,
+            domain TEXT NOT NULL DEFAULT '',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            streak INTEGER NOT NULL DEFAULT 0,
+            last_correct INTEGER NOT NULL DEFAULT 0,
+            last_answer TEXT,
+            last_seen INTEGER
+        )"""
+    )
+    cur.execute(
+        f"""INSERT INTO question_mastery_new
+            SELECT question_id, domain, attempts, correct, streak, last_correct, last_answer,
+                   {_epoch_ms_sql('last_seen')}
+            FROM question_mastery"""
+    )
+    cur.execute(
+        """CREATE TABLE daily_domain_stats_new (
+            day INTEGER NOT NULL,
+            domain TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, domain)
+        )"""
+    )
+    cur.execute(
+        f"""INSERT INTO daily_domain_stats_new
+            SELECT {_epoch_ms_sql('day')}, domain, attempts, correct FROM daily_domain_stats"""
+    )
+    cur.execute(
+        """CREATE TABLE daily_question_stats_new (
+            day INTEGER NOT NULL,
+            question_id TEXT NOT NULL,
+            domain TEXT NOT NULL DEFAULT '',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, question_id)
+        )"""
+    )
+    cur.execute(
+        f"""INSERT INTO daily_question_stats_new
+            SELECT {_epoch_ms_sql('day')}, question_id, domain, attempts, correct
+            FROM daily_question_stats"""
+    )
+    for table in ('results', 'question_mastery', 'daily_domain_stats', 'daily_question_stats'):
+        cur.execute(f'DROP TABLE {table}')
+        cur.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+
+    # Covering index: trend and recent-activity queries never touch the table
+    cur.execute('CREATE INDEX idx_results_timestamp ON results (timestamp, domain, correct)')
+    cur.execute('CREATE INDEX idx_results_domain_correct ON results (domain, correct)')
+    cur.execute('CREATE INDEX idx_results_question_timestamp ON results (question_id, timestamp)')
+    cur.execute('CREATE INDEX idx_mastery_last_correct ON question_mastery (last_correct, last_seen)')
+    cur.execute('CREATE INDEX idx_mastery_streak ON question_mastery (streak, last_seen)')
+
+
+# Schema history, applied in order by migrate(). The applied version is kept
+# in PRAGMA user_version. Never edit a released step; append a new one. Each
+# step is a list of SQL statements or callables taking a cursor.
+MIGRATIONS: List[Tuple[int, str, List[Union[str, Callable[[sqlite3.Cursor], None]]]]] = [
+    (1, 'results and favorites tables', [_create_base_tables]),
+    (2, 'indexes for statistics queries', [
+        'CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_results_domain_correct ON results (domain, correct)',
+        'CREATE INDEX IF NOT EXISTS idx_results_question_timestamp ON results (question_id, timestamp)',
+    ]),
+    (3, 'per-domain statistics aggregates', [
+        """CREATE TABLE IF NOT EXISTS domain_stats (
+            domain TEXT PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0
+        )""",
+        _rebuild_domain_stats,
+    ]),
+    (4, 'per-question mastery', [
+        # streak counts consecutive correct answers and drops to 0 on a miss
+        """CREATE TABLE IF NOT EXISTS question_mastery (
+            question_id TEXT PRIMARY KEY,
+            domain TEXT NOT NULL DEFAULT '',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            streak INTEGER NOT NULL DEFAULT 0,
+            last_correct INTEGER NOT NULL DEFAULT 0,
+            last_answer TEXT,
+            last_seen TEXT
+        )""",
+        'CREATE INDEX IF NOT EXISTS idx_mastery_last_correct ON question_mastery (last_correct, last_seen)',
+        'CREATE INDEX IF NOT EXISTS idx_mastery_streak ON question_mastery (streak, last_seen)',
+        _rebuild_question_mastery,
+    ]),
+    (5, 'daily roll-ups of compacted results', [
+        """CREATE TABLE IF NOT EXISTS daily_domain_stats (
+            day TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, domain)
+        )""",
+        """CREATE TABLE IF NOT EXISTS daily_question_stats (
+            day TEXT NOT NULL,
+            question_id TEXT NOT NULL,
+            domain TEXT NOT NULL DEFAULT '',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, question_id)
+        )""",
+    ]),
+    (6, 'integer epoch-millisecond timestamps', [_integer_timestamps]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Upgrade the database in place to SCHEMA_VERSION; returns the number of steps applied.
+
+    Each step runs in its own transaction together with the version bump,
+    so an interrupted upgrade resumes from the last completed step.
+    """
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f'Database schema version {current} is newer than this '
+                           f'application supports ({SCHEMA_VERSION})')
+    applied = 0
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        cur = conn.cursor()
+        cur.execute('BEGIN')
+        try:
+            for step in steps:
+                if callable(step):
+                    step(cur)
+                else:
+                    cur.execute(step)
+            cur.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f'Database migrated to version {version}: {description}')
+        applied += 1
+    return applied
+
+
+def init_db(path: str = DB_PATH) -> sqlite3.Connection:
+    conn = connect(path)
+    migrate(conn)
+    return conn
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def format_ms(ms: Optional[int]) -> Optional[str]:
+    """Epoch milliseconds as an ISO-8601 UTC string, the format timestamps used to be stored in"""
+    if ms is None:
+        return None
+    return datetime.utcfromtimestamp(ms / 1000).isoformat(timespec='milliseconds')
+
+
+def _result_row(question_id: str, user_answer: str, correct_answer: str,
+                correct: bool, domain: str) -> tuple:
+    return (question_id, user_answer, correct_answer, int(correct), domain, now_ms())
+
+
+def _insert_results(cur: sqlite3.Cursor, rows: List[tuple]) -> None:
+    """Insert result rows and update the aggregates; the caller owns the transaction"""
+    cur.executemany(
         "INSERT INTO results (question_id, user_answer, correct_answer, correct, domain, timestamp)"
         " VALUES (?, ?, ?, ?, ?, ?)",
-        (question_id, user_answer, correct_answer, int(correct), domain, datetime.utcnow().isoformat())
+        rows
+    )
+    per_domain: Dict[str, List[int]] = {}
+    for row in rows:
+        counts = per_domain.setdefault(row[4] or '', [0, 0])
+        counts[0] += 1
+        counts[1] += row[3]
+    cur.executemany(
+        """INSERT INTO domain_stats (domain, attempts, correct) VALUES (?, ?, ?)
+           ON CONFLICT (domain) DO UPDATE SET
+               attempts = attempts + excluded.attempts,
+               correct = correct + excluded.correct""",
+        [(domain, attempts, correct) for domain, (attempts, correct) in per_domain.items()]
+    )
+    # One upsert per row, in order, so repeated answers to the same question
+    # within a batch still build up the streak correctly
+    cur.executemany(
+        """INSERT INTO question_mastery
+               (question_id, domain, attempts, correct, streak, last_correct, last_answer, last_seen)
+           VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+           ON CONFLICT (question_id) DO UPDATE SET
+               domain = excluded.domain,
+               attempts = attempts + 1,
+               correct = correct + excluded.correct,
+               streak = CASE WHEN excluded.last_correct THEN streak + 1 ELSE 0 END,
+               last_correct = excluded.last_correct,
+               last_answer = excluded.last_answer,
+               last_seen = excluded.last_seen""",
+        [(row[0], row[4] or '', row[3], row[3], row[3], row[1], row[5]) for row in rows]
+    )
+
+
+def _add_domain_rollups(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """INSERT INTO domain_stats (domain, attempts, correct)
+           SELECT domain, SUM(attempts), SUM(correct) FROM daily_domain_stats
+           WHERE true GROUP BY domain
+           ON CONFLICT (domain) DO UPDATE SET
+               attempts = attempts + excluded.attempts,
+               correct = correct + excluded.correct"""
+    )
+
+
+def _question_rollup_seed(cur: sqlite3.Cursor) -> Dict[str, list]:
+    """Starting mastery rows for compacted history.
+
+    The order of rolled-up answers is gone, so streaks restart at zero and
+    the last answer counts as correct only if every rolled-up one was.
+    """
+    cur.execute(
+        """SELECT question_id, MAX(domain), SUM(attempts), SUM(correct), MAX(day)
+           FROM daily_question_stats GROUP BY question_id"""
     )
+    return {question_id: [question_id, domain, attempts, correct, 0,
+                          int(correct == attempts), None, day]
+            for question_id, domain, attempts, correct, day in cur.fetchall()}
+
+
+def rebuild_statistics(conn: sqlite3.Connection) -> None:
+    """Recompute the statistics aggregates from the raw results and daily roll-ups"""
+    cur = conn.cursor()
+    cur.execute('BEGIN')
+    try:
+        _rebuild_domain_stats(cur)
+        _add_domain_rollups(cur)
+        _rebuild_question_mastery(cur, _question_rollup_seed(cur))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def save_result(conn: sqlite3.Connection, question_id: str, user_answer: str,
+                correct_answer: str, correct: bool, domain: str) -> None:
+    cur = conn.cursor()
+    _insert_results(cur, [_result_row(question_id, user_answer, correct_answer, correct, domain)])
     conn.commit()
 
 
+class ResultWriter:
+    """Write-behind queue for save_result.
+
+    Answers are queued in memory and a background thread writes them in
+    batched transactions, committing when max_batch rows are waiting or
+    max_delay seconds after the first queued row, whichever comes first.
+    One commit (and fsync) then covers a whole burst of submissions.
+
+    The queue is bounded: when max_queue rows are pending (queued, or held
+    after a failed write), submit() blocks until the writer catches up. A
+    batch that still fails after RETRIES attempts is kept and retried with
+    later batches rather than dropped, so a database that stays unwritable
+    ends up blocking submit() instead of losing answers.
+    submit() raises RuntimeError once the writer is closed or its thread
+    has died, so callers can fall back to save_result(). close() flushes
+    everything still queued, so call it on shutdown.
+    """
+
+    RETRIES = 3
+    RETRY_INTERVAL = 5.0   # seconds between retries of a failed batch while idle
+    FLUSH_TIMEOUT = 10.0   # default wait of flush()
+
+    def __init__(self, path: str = DB_PATH, max_batch: int = 200,
+                 max_delay: float = 0.5, max_queue: int = 10000):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue()  # bounded by _pending, not maxsize
+        self._failed: List[tuple] = []  # rows whose batch could not be written yet
+        self._pending = 0  # rows submitted but not committed, failed ones included
+        self._closed = False
+        self._lock = threading.Lock()  # orders submit() against close()
+        self._room = threading.Condition(self._lock)  # signalled when rows are committed
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, question_id: str, user_answer: str, correct_answer: str,
+               correct: bool, domain: str, timeout: Optional[float] = None) -> None:
+        """Queue a result; blocks while the queue is full (raises queue.Full after timeout)"""
+        row = _result_row(question_id, user_answer, correct_answer, correct, domain)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError('ResultWriter is closed')
+                if not self._thread.is_alive():
+                    raise RuntimeError('ResultWriter thread has stopped')
+                if self._pending < self.max_queue:
+                    break
+                wait = 0.5  # wake now and then to notice a writer thread that died
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        raise queue.Full
+                self._room.wait(wait)
+            self._pending += 1
+            self._queue.put(row)
+
+    def pending(self) -> int:
+        return self._pending
+
+    def flush(self, timeout: Optional[float] = FLUSH_TIMEOUT) -> bool:
+        """Wait until every queued result has been handled; True if all of them are committed.
+
+        Returns False on timeout, if the writer thread has died, or if a
+        batch is being held for retry.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        q = self._queue
+        with q.all_tasks_done:
+            while q.unfinished_tasks:
+                if not self._thread.is_alive():
+                    return False
+                wait = 0.5
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return False
+                q.all_tasks_done.wait(wait)
+        return not self._failed
+
+    def close(self) -> None:
+        """Commit everything still queued and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._room.notify_all()  # submit() calls waiting for room give up
+            if self._thread.is_alive():
+                self._queue.put(None)  # wake the writer; everything before it gets written
+        self._thread.join()
+
+    def _next_batch(self) -> Tuple[List[tuple], bool]:
+        """Wait for a row, then gather more until the batch is full or max_delay passes"""
+        try:
+            # Wake up now and then to retry a failed batch even with no new rows
+            first = self._queue.get(timeout=self.RETRY_INTERVAL if self._failed else None)
+        except queue.Empty:
+            return [], False
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if row is None:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _write(self, conn: sqlite3.Connection, batch: List[tuple]) -> bool:
+        for attempt in range(1, self.RETRIES + 1):
+            try:
+                with conn:  # one transaction per batch
+                    _insert_results(conn.cursor(), batch)
+                return True
+            except sqlite3.Error as e:
+                if attempt == self.RETRIES:
+                    print(f'Could not write {len(batch)} quiz results after {attempt} attempts '
+                          f'({e}); keeping them for a later retry')
+                    return False
+                time.sleep(0.1 * attempt)
+        return False
+
+    def _run(self) -> None:
+        try:
+            conn = connect(self.path)
+        except sqlite3.Error as e:
+            print(f'Result writer for {self.path} could not open the database: {e}')
+            return
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                rows = self._failed + batch
+                if rows:
+                    # At most max_queue rows: submit() waits while that many are pending
+                    written = self._write(conn, rows)
+                    with self._lock:
+                        self._failed = [] if written else rows
+                        if written:
+                            self._pending -= len(rows)
+                            self._room.notify_all()
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+            if self._failed:
+                print(f'Lost {len(self._failed)} quiz results that could not be written to {self.path}')
+        finally:
+            conn.close()
+            with self._lock:
+                self._room.notify_all()  # let waiting submit() calls see the thread has stopped
+
+
 def mark_favorite(conn: sqlite3.Connection, question_id: str, fav: bool) -> None:
     cur = conn.cursor()
     if fav:
@@ -61,14 +655,121 @@ def get_favorite_questions(conn: sqlite3.Connection) -> List[str]:
     return [row[0] for row in cur.fetchall()]
 
 
+class FavoritesCache:
+    """In-memory set of favorite question IDs, written through to the database.
+
+    Loaded once; after that favorite checks are dict lookups. The dict keeps
+    the order favorites were added in, like the table's rowid order did.
+    set() writes the change to the favorites table first and only then
+    updates memory, so the cache never claims a favorite the database does
+    not have.
+
+    Given the database path, the cache can also follow changes made by
+    other processes: sync() reloads it whenever PRAGMA data_version on its
+    own connection shows that another connection has committed.
+
+    Database reads and writes happen outside the lock that guards the dict,
+    which is only held to swap or update it, so favorite checks never wait
+    behind a commit.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._ids: Dict[str, None] = {}
+        self._lock = threading.Lock()        # guards changes to _ids
+        self._write_lock = threading.Lock()  # keeps set() calls in commit order
+        self._watch_lock = threading.Lock()  # guards _watch, used by one thread at a time
+        self._watch = connect(path, check_same_thread=False) if path else None
+        self._data_version: Optional[int] = None
+
+    def load(self, conn: sqlite3.Connection) -> None:
+        with self._watch_lock:
+            version = self._read_data_version()
+        ids = dict.fromkeys(get_favorite_questions(conn))
+        with self._lock:
+            self._ids = ids
+            self._data_version = version
+
+    def _read_data_version(self) -> Optional[int]:
+        if self._watch is None:
+            return None
+        return self._watch.execute('PRAGMA data_version').fetchone()[0]
+
+    def sync(self) -> None:
+        """Reload if the database changed since the last load; a no-op without a path.
+
+        data_version also moves when this process commits (results count
+        too), so a reload here is cheap but not rare. If another thread is
+        already checking, this returns at once rather than queue behind it.
+        """
+        if self._watch is None or not self._watch_lock.acquire(blocking=False):
+            return
+        try:
+            # Version first: a commit landing after it is caught next time
+            version = self._read_data_version()
+            if version == self._data_version:
+                return
+            ids = dict.fromkeys(get_favorite_questions(self._watch))
+        finally:
+            self._watch_lock.release()
+        with self._lock:
+            self._ids = ids
+            self._data_version = version
+
+    def close(self) -> None:
+        if self._watch is not None:
+            with self._watch_lock:
+                self._watch.close()
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> List[str]:
+        """Favorite IDs, oldest first"""
+        return list(self._ids)
+
+    def set(self, conn: sqlite3.Connection, question_id: str, fav: bool) -> int:
+        """Mark or unmark a favorite; returns the change in favorite count (-1, 0 or +1)"""
+        with self._write_lock:
+            if (question_id in self._ids) == fav:
+                return 0
+            mark_favorite(conn, question_id, fav)
+            with self._lock:
+                if fav:
+                    self._ids[question_id] = None
+                else:
+                    self._ids.pop(question_id, None)
+            return 1 if fav else -1
+
+    def toggle(self, conn: sqlite3.Connection, question_id: str) -> bool:
+        """Flip a question's favorite state; returns the new state"""
+        fav = question_id not in self._ids
+        self.set(conn, question_id, fav)
+        return fav
+
+
 def get_results_summary(conn: sqlite3.Connection) -> Dict[str, Any]:
     """Get overall quiz performance statistics"""
     cur = conn.cursor()
     
-    # Overall stats
-    cur.execute("SELECT COUNT(*), SUM(correct) FROM results")
-    total_row = cur.fetchone()
-    if not total_row or total_row[0] == 0:
+    # Per-domain aggregates are maintained by save_result, so this is
+    # O(domains) rather than a scan of every recorded answer
+    cur.execute("SELECT domain, attempts, correct FROM domain_stats ORDER BY domain")
+    domain_stats = {}
+    overall_attempts = overall_correct = 0
+    for domain, attempts, correct in cur.fetchall():
+        if not attempts:
+            continue
+        domain_stats[domain] = {
+            'attempts': attempts,
+            'correct': correct
+        }
+        overall_attempts += attempts
+        overall_correct += correct
+    
+    if overall_attempts == 0:
         return {
             'overall_attempts': 0,
             'overall_correct': 0,
@@ -77,23 +778,6 @@ def get_results_summary(conn: sqlite3.Connection) -> Dict[str, Any]:
             'favorite_count': 0
         }
     
-    overall_attempts, overall_correct = total_row
-    
-    # Domain-specific stats
-    cur.execute("""
-        SELECT domain, COUNT(*) as attempts, SUM(correct) as correct
-        FROM results 
-        GROUP BY domain 
-        ORDER BY domain
-    """)
-    domain_stats = {}
-    for row in cur.fetchall():
-        domain, attempts, correct = row
-        domain_stats[domain] = {
-            'attempts': attempts,
-            'correct': correct or 0
-        }
-    
     # Recent results
     cur.execute("""
         SELECT domain, correct, timestamp
@@ -106,7 +790,7 @@ def get_results_summary(conn: sqlite3.Connection) -> Dict[str, Any]:
         recent_results.append({
             'domain': row[0],
             'correct': bool(row[1]),
-            'timestamp': row[2]
+            'timestamp': format_ms(row[2])
         })
     
     # Favorite count
@@ -140,15 +824,252 @@ def get_recent_results(conn: sqlite3.Connection, limit: int = 50) -> List[Dict[s
             'correct_answer': row[2],
             'correct': bool(row[3]),
             'domain': row[4],
-            'timestamp': row[5]
+            'timestamp': format_ms(row[5])
         })
     
     return results
 
 
+def get_missed_questions(conn: sqlite3.Connection, limit: Optional[int] = None) -> List[str]:
+    """IDs of questions whose last answer was wrong, most recent miss first"""
+    cur = conn.execute(
+        """SELECT question_id FROM question_mastery
+           WHERE last_correct = 0 ORDER BY last_seen DESC LIMIT ?""",
+        (-1 if limit is None else limit,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def get_weak_questions(conn: sqlite3.Connection, min_streak: int = WEAK_STREAK,
+                       limit: Optional[int] = None) -> List[str]:
+    """IDs of attempted questions not yet answered correctly min_streak times in a row.
+
+    Weakest first (lowest streak), then longest unseen.
+    """
+    cur = conn.execute(
+        """SELECT question_id FROM question_mastery
+           WHERE streak < ? ORDER BY streak, last_seen LIMIT ?""",
+        (min_streak, -1 if limit is None else limit)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def get_trend(conn: sqlite3.Connection, bucket: str = 'day', days: Optional[int] = 90,
+              points: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Any]:
+    """Attempts, correct answers and accuracy per time bucket, per domain and overall.
+
+    bucket is 'day' (UTC) or 'week' (starting Monday); days=None covers the
+    whole history. With points, buckets are widened by whole days or weeks
+    until each series has at most that many, so long histories come back at
+    a fixed resolution. Compacted days are read from daily_domain_stats and
+    the rest from results, both as range scans on their time-ordered indexes.
+    """
+    unit = {'day': 1, 'week': 7}.get(bucket)
+    if unit is None:
+        raise ValueError(f'Unknown trend bucket: {bucket}')
+    if points is not None and points < 1:
+        raise ValueError(f'Trend points must be at least 1, not {points}')
+    unit_ms = unit * DAY_MS
+    origin = WEEK_ORIGIN_MS if bucket == 'week' else 0
+    end = now_ms() if end is None else end
+    end += unit_ms - (end - origin) % unit_ms  # end of the current day or week
+
+    if days is None:
+        first = conn.execute(
+            """SELECT MIN(first) FROM (SELECT MIN(timestamp) AS first FROM results
+                                      UNION ALL SELECT MIN(day) FROM daily_domain_stats)"""
+        ).fetchone()[0]
+        span = end - first if first is not None else unit_ms
+    else:
+        span = max(days, 1) * DAY_MS
+    units = -(-span // unit_ms)  # ceiling division
+    factor = -(-units // points) if points and units > points else 1
+    width = unit_ms * factor
+    count = -(-units // factor)
+    start = end - count * width
+
+    totals: Dict[str, Tuple[List[int], List[int]]] = {}
+    params = {'start': start, 'end': end, 'width': width}
+    for sql in (
+        """SELECT (timestamp - :start) / :width, COALESCE(domain, ''), COUNT(*), SUM(correct)
+           FROM results WHERE timestamp >= :start AND timestamp < :end GROUP BY 1, 2""",
+        """SELECT (day - :start) / :width, domain, SUM(attempts), SUM(correct)
+           FROM daily_domain_stats WHERE day >= :start AND day < :end GROUP BY 1, 2""",
+    ):
+        for index, domain, attempts, correct in conn.execute(sql, params):
+            attempts_series, correct_series = totals.setdefault(domain, ([0] * count, [0] * count))
+            attempts_series[index] += attempts
+            correct_series[index] += correct or 0
+
+    def series(attempts: List[int], correct: List[int]) -> Dict[str, list]:
+        return {
+            'attempts': attempts,
+            'correct': correct,
+            'accuracy': [round(c / a * 100, 1) if a else None for a, c in zip(attempts, correct)],
+        }
+
+    overall_attempts = [sum(col) for col in zip(*(a for a, _ in totals.values()))] or [0] * count
+    overall_correct = [sum(col) for col in zip(*(c for _, c in totals.values()))] or [0] * count
+    return {
+        'bucket': bucket,
+        'bucket_days': unit * factor,
+        'labels': [format_ms(start + i * width)[:10] for i in range(count)],
+        'domains': {domain: series(a, c) for domain, (a, c) in sorted(totals.items())},
+        'overall': series(overall_attempts, overall_correct),
+    }
+
+
 def clear_all_statistics(conn: sqlite3.Connection) -> int:
     """Clear all quiz results and reset statistics"""
     cur = conn.cursor()
     cur.execute('DELETE FROM results')
+    rows_deleted = cur.rowcount
+    cur.execute('DELETE FROM domain_stats')
+    cur.execute('DELETE FROM question_mastery')
+    cur.execute('DELETE FROM daily_domain_stats')
+    cur.execute('DELETE FROM daily_question_stats')
     conn.commit()
-    return cur.rowcount
+    return rows_deleted
+
+
+def _incremental_vacuum(conn: sqlite3.Connection) -> int:
+    """Return free pages to the filesystem; returns how many were freed"""
+    pages = conn.execute('PRAGMA page_count').fetchone()[0]
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:  # 2 = INCREMENTAL
+        # Databases created before auto_vacuum was enabled need one full
+        # VACUUM for the setting to take effect
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    else:
+        # executescript steps the pragma to completion; a plain execute()
+        # would free a single page
+        conn.executescript('PRAGMA incremental_vacuum')
+    return pages - conn.execute('PRAGMA page_count').fetchone()[0]
+
+
+def compact_results(conn: sqlite3.Connection, retain_days: int,
+                    now: Optional[int] = None) -> Dict[str, Any]:
+    """Roll results older than retain_days into daily aggregates and delete them.
+
+    Only whole days are rolled up. domain_stats and question_mastery already
+    count the compacted answers and are left alone, so overall statistics do
+    not change; recent results keep their raw rows.
+    """
+    if retain_days < 1:
+        raise ValueError('retain_days must be at least 1')
+    now = now_ms() if now is None else now
+    cutoff = now - now % DAY_MS - retain_days * DAY_MS  # midnight UTC, whole days only
+    cur = conn.cursor()
+    cur.execute('BEGIN')
+    try:
+        cur.execute(
+            f"""INSERT INTO daily_domain_stats (day, domain, attempts, correct)
+               SELECT timestamp - timestamp % {DAY_MS}, COALESCE(domain, ''), COUNT(*),
+                      COALESCE(SUM(correct), 0)
+               FROM results WHERE timestamp < ? GROUP BY 1, 2
+               ON CONFLICT (day, domain) DO UPDATE SET
+                   attempts = attempts + excluded.attempts,
+                   correct = correct + excluded.correct""",
+            (cutoff,)
+        )
+        cur.execute(
+            f"""INSERT INTO daily_question_stats (day, question_id, domain, attempts, correct)
+               SELECT timestamp - timestamp % {DAY_MS}, question_id, MAX(COALESCE(domain, '')),
+                      COUNT(*), COALESCE(SUM(correct), 0)
+               FROM results WHERE timestamp < ? GROUP BY 1, 2
+               ON CONFLICT (day, question_id) DO UPDATE SET
+                   attempts = attempts + excluded.attempts,
+                   correct = correct + excluded.correct""",
+            (cutoff,)
+        )
+        cur.execute('DELETE FROM results WHERE timestamp < ?', (cutoff,))
+        rolled_up = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'cutoff': format_ms(cutoff)[:10], 'rolled_up': rolled_up,
+            'pages_freed': _incremental_vacuum(conn)}
+
+
+class ResultsCompactor:
+    """Run compact_results() on a background thread every interval seconds.
+
+    path is a database path or a callable returning the paths to compact
+    (e.g. every profile's shard). Uses its own connections; WAL and
+    busy_timeout let it run alongside request handlers and the write-behind
+    writer.
+    """
+
+    def __init__(self, path: Union[str, Callable[[], List[str]]] = DB_PATH,
+                 retain_days: int = 90, interval: float = 86400):
+        self.path = path
+        self.retain_days = retain_days
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, Dict[str, Any]]:
+        paths = self.path() if callable(self.path) else [self.path]
+        summaries = {}
+        for path in paths:
+            conn = init_db(path)
+            try:
+                summary = compact_results(conn, self.retain_days)
+            finally:
+                conn.close()
+            print(f'Compacted {path} before {summary["cutoff"]}: {summary["rolled_up"]} rows '
+                  f'rolled up, {summary["pages_freed"]} pages freed')
+            summaries[path] = summary
+        return summaries
+
+    def start(self) -> 'ResultsCompactor':
+        """Compact now and then every interval seconds in a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='results-compactor', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f'Results compaction failed: {e}')
+            if self._stop.wait(self.interval):
+                return
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Quiz results database maintenance')
+    parser.add_argument('command', choices=['migrate', 'rebuild-stats', 'compact'])
+    parser.add_argument('--db', default=DB_PATH, help='database path (default: %(default)s)')
+    parser.add_argument('--days', type=int, default=90,
+                        help='compact: keep raw results for this many days (default: %(default)s)')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if args.command == 'migrate':
+            applied = migrate(conn)
+            print(f'{args.db}: schema version {get_schema_version(conn)} ({applied} migrations applied)')
+        elif args.command == 'rebuild-stats':
+            migrate(conn)
+            rebuild_statistics(conn)
+            print(f'{args.db}: statistics aggregates rebuilt')
+        elif args.command == 'compact':
+            migrate(conn)
+            summary = compact_results(conn, args.days)
+            print(f'{args.db}: {summary["rolled_up"]} results before {summary["cutoff"]} rolled up, '
+                  f'{summary["pages_freed"]} pages freed')
+    finally:
+        conn.close()
@@ -0,0 +1,107 @@
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from .data import Question, QuestionStore
+
+MASK64 = (1 << 64) - 1
+FEISTEL_ROUNDS = 4
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finalizer: a fast, well-distributed 64-bit integer hash"""
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class Permutation:
+    """Pseudo-random shuffle of range(n) defined by a seed, evaluated one index at a time.
+
+    A small Feistel network is a bijection on the smallest even-bit-width
+    power of two covering n; indexes that land outside range(n) are fed
+    through again (cycle walking), which takes under four rounds on average.
+    Nothing proportional to n is ever allocated.
+    """
+
+    def __init__(self, n: int, seed: int):
+        self.n = n
+        half = max(1, ((n - 1).bit_length() + 1) // 2)
+        self._half = half
+        self._mask = (1 << half) - 1
+        self._keys = [_mix64(seed * FEISTEL_ROUNDS + r) for r in range(FEISTEL_ROUNDS)]
+
+    def _encrypt(self, x: int) -> int:
+        left, right = x >> self._half, x & self._mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix64(right ^ key) & self._mask)
+        return (left << self._half) | right
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i: int) -> int:
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        x = self._encrypt(i)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+
+class Deck:
+    """Quiz question sequence described by a filter and a shuffle seed.
+
+    A deck is either every question in some domains, in bank order (walked
+    through the store's runs of consecutive same-domain positions) or an
+    explicit list of question IDs for decks derived from search results,
+    favorites and the like. With a seed the order is a Permutation, so
+    deck[i] is computed on demand and nothing is copied or shuffled when a
+    quiz starts. descriptor() is what goes in the session.
+    """
+
+    def __init__(self, store: QuestionStore, domains: Optional[Iterable[str]] = None,
+                 ids: Optional[Sequence[str]] = None, seed: Optional[int] = None):
+        self.store = store
+        self.seed = seed
+        self.ids = list(ids) if ids is not None else None
+        if self.ids is not None:
+            self.domains = None
+            n = len(self.ids)
+        else:
+            names = store.catalog.names if domains is None else set(domains)
+            self.domains = None if domains is None else sorted(names)
+            self._runs, self._offsets = store.runs_for(names)
+            n = self._offsets[-1]
+        self._n = n
+        self._order = Permutation(n, seed) if seed is not None and n else None
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, index: int) -> Optional[Question]:
+        """Question at index; None if an ID deck names a question no longer in the bank"""
+        if not 0 <= index < self._n:
+            raise IndexError(index)
+        if self._order is not None:
+            index = self._order[index]
+        if self.ids is not None:
+            return self.store.get(self.ids[index])
+        r = bisect_right(self._offsets, index) - 1
+        return self.store.at(self._runs[r][0] + index - self._offsets[r])
+
+    def descriptor(self) -> Dict[str, Any]:
+        """Compact, JSON-serializable form; omitted domains mean the whole bank"""
+        desc: Dict[str, Any] = {'v': self.store.version}
+        if self.seed is not None:
+            desc['s'] = self.seed
+        if self.ids is not None:
+            desc['i'] = self.ids
+        elif self.domains is not None:
+            desc['d'] = self.domains
+        return desc
+
+    @classmethod
+    def from_descriptor(cls, store: QuestionStore, desc: Dict[str, Any]) -> 'Deck':
+        """Rebuild a deck; pass the store whose version matches desc['v'] to get the same questions"""
+        return cls(store, domains=desc.get('d'), ids=desc.get('i'), seed=desc.get('s'))
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import sqlite3
+from typing import Any, Callable, Dict, Iterator, Sequence, TextIO, Tuple
+
+from .db import DB_PATH, connect, format_ms, migrate
+
+FORMATS = ('csv', 'jsonl')
+CHUNK_ROWS = 1000  # rows fetched from SQLite and encoded per yielded chunk
+
+# name -> (query, column names, per-column converters). Rows are read in
+# primary key order so an export can be compared or resumed by key.
+DATASETS: Dict[str, Tuple[str, Sequence[str], Dict[str, Callable[[Any], Any]]]] = {
+    'results': (
+        """SELECT id, question_id, user_answer, correct_answer, correct, domain, timestamp
+           FROM results ORDER BY id""",
+        ('id', 'question_id', 'user_answer', 'correct_answer', 'correct', 'domain', 'timestamp'),
+        {'correct': bool, 'timestamp': format_ms},
+    ),
+    'domains': (
+        'SELECT domain, attempts, correct FROM domain_stats ORDER BY domain',
+        ('domain', 'attempts', 'correct'),
+        {},
+    ),
+    'mastery': (
+        """SELECT question_id, domain, attempts, correct, streak, last_correct, last_answer, last_seen
+           FROM question_mastery ORDER BY question_id""",
+        ('question_id', 'domain', 'attempts', 'correct', 'streak', 'last_correct',
+         'last_answer', 'last_seen'),
+        {'last_correct': bool, 'last_seen': format_ms},
+    ),
+    # Answers older than retention_days survive only as these daily roll-ups
+    'daily_domains': (
+        'SELECT day, domain, attempts, correct FROM daily_domain_stats ORDER BY day, domain',
+        ('day', 'domain', 'attempts', 'correct'),
+        {'day': format_ms},
+    ),
+    'daily_questions': (
+        """SELECT day, question_id, domain, attempts, correct
+           FROM daily_question_stats ORDER BY day, question_id""",
+        ('day', 'question_id', 'domain', 'attempts', 'correct'),
+        {'day': format_ms},
+    ),
+}
+
+
+def iter_rows(conn: sqlite3.Connection, dataset: str,
+              chunk_rows: int = CHUNK_ROWS) -> Iterator[list]:
+    """Yield lists of converted rows, chunk_rows at a time.
+
+    The cursor steps through the query as rows are fetched, so only one
+    chunk is ever held in memory. In WAL mode the open read does not block
+    writers.
+    """
+    sql, columns, converters = DATASETS[dataset]
+    convert = [converters.get(name) for name in columns]
+    cur = conn.execute(sql)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield [[value if fn is None or value is None else fn(value)
+                    for fn, value in zip(convert, row)] for row in rows]
+    finally:
+        cur.close()
+
+
+def iter_export(conn: sqlite3.Connection, dataset: str, fmt: str = 'csv',
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """Encode a dataset as CSV (with header) or JSON Lines, one text chunk per batch of rows"""
+    if dataset not in DATASETS:
+        raise ValueError(f'Unknown export dataset: {dataset}')
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    columns = DATASETS[dataset][1]
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for chunk in iter_rows(conn, dataset, chunk_rows):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()  # header only, for an empty dataset
+    else:
+        for chunk in iter_rows(conn, dataset, chunk_rows):
+            yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                          for row in chunk)
+
+
+def export_to_file(path: str, dataset: str, fmt: str, out: TextIO,
+                   chunk_rows: int = CHUNK_ROWS) -> None:
+    conn = connect(path)
+    try:
+        migrate(conn)
+        for text in iter_export(conn, dataset, fmt, chunk_rows):
+            out.write(text)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Export quiz results and statistics')
+    parser.add_argument('dataset', choices=sorted(DATASETS))
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--db', default=DB_PATH, help='database path (default: %(default)s)')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            export_to_file(args.db, args.dataset, args.format, f)
+    else:
+        export_to_file(args.db, args.dataset, args.format, sys.stdout)
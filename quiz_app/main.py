@@ -2,10 +2,10 @@ import os
 import tkinter as tk
 from typing import List
 
-from .data import load_questions
-from .db import init_db
+from .data import FileLoadResult, load_questions, report_file_results
+from .db import init_db, ResultWriter, ResultsCompactor
 from .config import load_config
-from .ollama import list_models, check_ollama_status
+from .ollama import ModelDiscovery
 from .ui import QuizUI
 
 
@@ -17,41 +17,38 @@ def main():
         print('Place question JSON files in', cfg['data_dir'])
         return
         
-    questions = load_questions(cfg['data_dir'])
+    file_results: List[FileLoadResult] = []
+    questions = load_questions(cfg['data_dir'], workers=cfg.get('load_workers', 0),
+                               file_results=file_results)
+    report_file_results(file_results)
     if not questions:
         print('No questions found. Add JSON files to', cfg['data_dir'])
         print('Sample JSON format:')
         print('[{"id": "1", "domain": "Security Management", "type": "mcq", "question": "...", "choices": [...], "answer": "..."}]')
         return
         
-    print(f'Loaded {len(questions)} questions from {len(set(q.filepath for q in questions))} files')
+    print(f'Loaded {len(questions)} questions from {len(questions.filepaths())} files')
     
-    # Check Ollama availability
-    model = ''
-    if check_ollama_status():
-        models = list_models()
-        if models:
-            print('Available Ollama models:', ', '.join(models))
-            model = cfg.get('ollama_model', models[0])
-            if model not in models:
-                model = models[0]
-            print(f'Using model: {model}')
-        else:
-            print('Ollama is running but no models found')
-    else:
-        print('Ollama not available - explanations will be disabled')
+    # Find an Ollama model in the background so the window opens immediately
+    discovery = ModelDiscovery(cfg.get('ollama_model', '')).start()
     
     conn = init_db()
+    writer = ResultWriter() if cfg.get('write_behind', False) else None
+    if cfg.get('retention_days', 0):
+        ResultsCompactor(retain_days=cfg['retention_days'],
+                         interval=cfg.get('compact_interval_hours', 24) * 3600).start()
     root = tk.Tk()
     
     try:
-        QuizUI(root, questions, conn, model)
+        QuizUI(root, questions, conn, '', discovery, writer)
         root.mainloop()
     except KeyboardInterrupt:
         print("\nQuiz application closed")
     except Exception as e:
         print(f"Error running quiz application: {e}")
     finally:
+        if writer is not None:
+            writer.close()
         conn.close()
 
 
@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+SNAPSHOT_INTERVAL = 1.0  # seconds between a process's writes of its shared metrics file
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def combine(values: Dict[Tuple[str, ...], Any], labels: Tuple[str, ...], value: Any) -> None:
+        """Add another process's value for labels into values"""
+        values[labels] = values.get(labels, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {}
+
+    def samples(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> Iterator[str]:
+        for labels, value in sorted((self.values() if values is None else values).items()):
+            yield f'{self.name}{_label_text(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    """Observations counted into fixed cumulative buckets per label combination.
+
+    Only bucket counts, the sum and the count are kept, so memory stays
+    constant however many observations are made; quantiles are estimated
+    by the scraper from the buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (last is +Inf)..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            row[slot] += 1
+            row[-1] += value
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {labels: list(row) for labels, row in self._values.items()}
+
+    @staticmethod
+    def combine(values: Dict[Tuple[str, ...], Any], labels: Tuple[str, ...], row: Any) -> None:
+        """Add another process's bucket counts and sum for labels into values"""
+        mine = values.get(labels)
+        if mine is None:
+            values[labels] = list(row)
+        elif len(mine) == len(row):  # rows from other bucket layouts are skipped
+            values[labels] = [a + b for a, b in zip(mine, row)]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {}
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of the with block in seconds, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self, values: Optional[Dict[Tuple[str, ...], List[float]]] = None) -> Iterator[str]:
+        for labels, row in sorted((self.values() if values is None else values).items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                label_text = _label_text(self.labelnames, labels, 'le="' + le + '"')
+                yield f'{self.name}_bucket{label_text} {cumulative}'
+            label_text = _label_text(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {_number(row[-1])}'
+            yield f'{self.name}_count{label_text} {cumulative}'
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[object] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, list]:
+        """Every metric's values as JSON-serializable [labels, value] pairs"""
+        return {metric.name: [[list(labels), value] for labels, value in metric.values().items()]
+                for metric in self._metrics}
+
+    def reset(self) -> None:
+        """Forget all recorded values, e.g. those a forked worker inherited from its parent"""
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self, snapshots: Iterable[Dict[str, list]] = ()) -> str:
+        """Text exposition of this registry, with the values of snapshots() from other processes added in"""
+        snapshots = list(snapshots)
+        lines: List[str] = []
+        for metric in self._metrics:
+            values = metric.values()
+            for snapshot in snapshots:
+                for labels, value in snapshot.get(metric.name, ()):
+                    metric.combine(values, tuple(labels), value)
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(values))
+        return '\n'.join(lines) + '\n'
+
+
+class SharedMetrics:
+    """One view of a registry across the worker processes of a server.
+
+    Each process writes a snapshot of its registry to <directory>/<pid>.json
+    every SNAPSHOT_INTERVAL seconds (and on stop()); render() adds every
+    other process's file to this process's live values. Files of workers
+    that have exited are kept and still counted, so whichever worker
+    answers a scrape, counters never go backwards. Other workers' values
+    can lag by up to SNAPSHOT_INTERVAL.
+    """
+
+    def __init__(self, registry: 'Registry', directory: str,
+                 interval: float = SNAPSHOT_INTERVAL):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._path = os.path.join(directory, f'{os.getpid()}.json')
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SharedMetrics':
+        self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()  # final values, kept for later scrapes
+
+    def write(self) -> None:
+        tmp_path = f'{self._path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.registry.snapshot(), f, separators=(',', ':'))
+            os.replace(tmp_path, self._path)  # readers never see a half-written file
+        except OSError as e:
+            print(f'Could not write metrics snapshot {self._path}: {e}')
+
+    def _others(self) -> Iterator[Dict[str, list]]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.json') or path == self._path:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def render(self) -> str:
+        return self.registry.render(self._others())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+
+REGISTRY = Registry()
+
+request_duration = REGISTRY.histogram(
+    'quiz_http_request_duration_seconds', 'Time to produce a response, by route',
+    ('route', 'method'))
+requests_total = REGISTRY.counter(
+    'quiz_http_requests_total', 'Responses by route and status code',
+    ('route', 'method', 'status'))
+response_size = REGISTRY.histogram(
+    'quiz_http_response_size_bytes', 'Response body size, by route',
+    ('route', 'method'), buckets=SIZE_BUCKETS)
+ollama_duration = REGISTRY.histogram(
+    'quiz_ollama_request_duration_seconds', 'Time spent waiting on the Ollama API',
+    ('operation',))
+sqlite_duration = REGISTRY.histogram(
+    'quiz_sqlite_query_duration_seconds',
+    'Time to execute SQLite statements (rows fetched later are not included)',
+    ('statement', 'table'))
+
+
+def _counted(body: Iterable[bytes], route: str, method: str) -> Iterator[bytes]:
+    """Pass a streamed body through, recording its size once it has been sent"""
+    size = 0
+    try:
+        for chunk in body:
+            size += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()  # e.g. lets an export generator release its connection
+        response_size.observe(size, route, method)
+
+
+def instrument(app) -> None:
+    """Record latency, status and size of every response of a Flask app.
+
+    Routes are labelled by their rule ('/api/export/<dataset>'), not the
+    requested path, so the number of series stays bounded.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        method = request.method
+        request_duration.observe(time.perf_counter() - started, route, method)
+        requests_total.inc(route, method, str(response.status_code))
+        if response.is_streamed:
+            response.response = _counted(response.response, route, method)
+        else:
+            response_size.observe(response.content_length or 0, route, method)
+        return response
@@ -1,7 +1,10 @@
 import json
+import threading
 import urllib.request
 import urllib.error
-from typing import List
+from typing import Callable, List, Optional
+
+from .metrics import ollama_duration
 
 OLLAMA_HOST = 'http://localhost:11434'
 
@@ -9,9 +12,10 @@ OLLAMA_HOST = 'http://localhost:11434'
 def list_models() -> List[str]:
     """Get list of available Ollama models"""
     try:
-        with urllib.request.urlopen(f'{OLLAMA_HOST}/api/tags', timeout=10) as r:
-            data = json.loads(r.read().decode())
-            return [m['name'] for m in data.get('models', [])]
+        with ollama_duration.time('tags'):
+            with urllib.request.urlopen(f'{OLLAMA_HOST}/api/tags', timeout=10) as r:
+                data = json.loads(r.read().decode())
+        return [m['name'] for m in data.get('models', [])]
     except (urllib.error.URLError, json.JSONDecodeError, Exception):
         return []
 
@@ -42,19 +46,23 @@ def ask_model(model: str, prompt: str) -> str:
     )
     
     try:
-        with urllib.request.urlopen(req, timeout=60) as r:
-            if r.status != 200:
-                return f"Ollama API error: HTTP {r.status}"
-            
-            response_data = json.loads(r.read().decode('utf-8'))
+        with ollama_duration.time('generate'):
+            with urllib.request.urlopen(req, timeout=60) as r:
+                status = r.status
+                body = r.read()
+        
+        if status != 200:
+            return f"Ollama API error: HTTP {status}"
+        
+        response_data = json.loads(body.decode('utf-8'))
+        
+        if 'response' in response_data:
+            return response_data['response'].strip()
+        elif 'error' in response_data:
+            return f"Ollama error: {response_data['error']}"
+        else:
+            return "Received unexpected response format from Ollama"
             
-            if 'response' in response_data:
-                return response_data['response'].strip()
-            elif 'error' in response_data:
-                return f"Ollama error: {response_data['error']}"
-            else:
-                return "Received unexpected response format from Ollama"
-                
     except urllib.error.URLError as e:
         if hasattr(e, 'reason'):
             return f"Could not connect to Ollama: {e.reason}"
@@ -71,7 +79,64 @@ def ask_model(model: str, prompt: str) -> str:
 def check_ollama_status() -> bool:
     """Check if Ollama is running and accessible"""
     try:
-        with urllib.request.urlopen(f'{OLLAMA_HOST}/api/tags', timeout=5) as r:
-            return r.status == 200
+        with ollama_duration.time('status'):
+            with urllib.request.urlopen(f'{OLLAMA_HOST}/api/tags', timeout=5) as r:
+                return r.status == 200
     except Exception:
         return False
+
+
+class ModelDiscovery:
+    """Find a usable Ollama model in a background thread.
+
+    check_ollama_status() and list_models() can block for up to 15 seconds
+    when Ollama is down or slow, so startup kicks this off and carries on.
+    status is 'warming_up' until the lookup finishes, then 'ready' (model is
+    set) or 'unavailable'. on_done is called with the chosen model ('' if
+    none) from the discovery thread.
+    """
+
+    def __init__(self, preferred: str = '', on_done: Optional[Callable[[str], None]] = None):
+        self.preferred = preferred
+        self.on_done = on_done
+        self.model = ''
+        self.models: List[str] = []
+        self.status = 'warming_up'
+        self._done = threading.Event()
+
+    def start(self) -> 'ModelDiscovery':
+        threading.Thread(target=self._run, name='ollama-discovery', daemon=True).start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            if check_ollama_status():
+                self.models = list_models()
+                if self.models:
+                    print('Available Ollama models:', ', '.join(self.models))
+                    model = self.preferred or self.models[0]
+                    if model not in self.models:
+                        model = self.models[0]
+                    self.model = model
+                    print(f'Using Ollama model: {model}')
+                else:
+                    print('Ollama running but no models found')
+            else:
+                print('Ollama not available - explanations will be disabled')
+        finally:
+            # Publish the model before leaving 'warming_up', so nobody sees
+            # discovery finished while the model is still unset
+            try:
+                if self.on_done:
+                    self.on_done(self.model)
+            finally:
+                self.status = 'ready' if self.model else 'unavailable'
+                self._done.set()
+
+    @property
+    def warming_up(self) -> bool:
+        return not self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until discovery finishes; returns False on timeout"""
+        return self._done.wait(timeout)
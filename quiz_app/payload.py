@@ -0,0 +1,60 @@
+import json
+import threading
+from typing import Any, Dict, Sequence, Tuple
+
+from .data import Question
+
+
+def encode_json(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class PayloadCache:
+    """Cache of pre-encoded JSON fragments for question content.
+
+    Question text, choices and answer never change between requests, so each
+    question is encoded once and reused. Entries remember the Question object
+    they were built from; after a hot reload a replaced question is simply a
+    miss and gets re-encoded.
+    """
+
+    def __init__(self):
+        self._fragments: Dict[str, Tuple[Question, bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, question: Question) -> bytes:
+        """Return the encoded JSON object for question"""
+        entry = self._fragments.get(question.id)
+        if entry is not None and entry[0] is question:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        encoded = encode_json(question.to_dict())
+        self._fragments[question.id] = (question, encoded)
+        with self._lock:
+            self.misses += 1
+        return encoded
+
+    def render(self, question: Question, fields: Dict[str, Any]) -> bytes:
+        """Encode {"question": <cached fragment>, **fields} without re-encoding the question"""
+        if not fields:
+            return b'{"question":' + self.fragment(question) + b'}'
+        return b'{"question":' + self.fragment(question) + b',' + encode_json(fields)[1:]
+
+    @staticmethod
+    def attach(payload: bytes, name: str, items: Sequence[bytes]) -> bytes:
+        """Add a list of already encoded objects to an encoded object as payload[name]"""
+        return payload[:-1] + b',' + encode_json(name) + b':[' + b','.join(items) + b']}'
+
+    def clear(self) -> None:
+        self._fragments = {}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._fragments),
+        }
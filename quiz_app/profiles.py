@@ -0,0 +1,210 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .db import (DB_PATH, ConnectionPool, FavoritesCache, ResultWriter, connect, init_db,
+                 now_ms)
+
+CATALOG_PATH = 'profiles.db'
+SHARD_DIR = 'profiles'
+DEFAULT_PROFILE = 'default'
+PROFILE_NAME_RE = re.compile(r'^[\w .-]{1,40}$')
+SHARD_IDLE_CONNECTIONS = 2  # pooled connections kept per open shard
+
+
+class ProfileCatalog:
+    """Shared table mapping profile names to their results database (shard).
+
+    The default profile maps to quiz_results.db, so data from before
+    profiles existed stays with it. Other profiles get their own file in
+    shard_dir, named after the profile's row id rather than its name.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH, shard_dir: str = SHARD_DIR,
+                 default_shard: str = DB_PATH):
+        self.shard_dir = shard_dir
+        self._lock = threading.Lock()
+        self._conn = connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS profiles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    shard TEXT NOT NULL,
+                    created_at INTEGER NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                'INSERT OR IGNORE INTO profiles (name, shard, created_at) VALUES (?, ?, ?)',
+                (DEFAULT_PROFILE, default_shard, now_ms())
+            )
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT name FROM profiles ORDER BY id')]
+
+    def shard_paths(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT shard FROM profiles ORDER BY id')]
+
+    def shard_path(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT shard FROM profiles WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def create(self, name: str) -> str:
+        """Register a profile and create its shard; returns the shard path"""
+        if not PROFILE_NAME_RE.match(name):
+            raise ValueError('Profile names are 1-40 letters, digits, spaces, dots, dashes or underscores')
+        existing = self.shard_path(name)
+        if existing is not None:
+            return existing
+        os.makedirs(self.shard_dir, exist_ok=True)
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    'INSERT INTO profiles (name, shard, created_at) VALUES (?, ?, ?)',
+                    (name, '', now_ms())
+                )
+                path = os.path.join(self.shard_dir, f'user_{cur.lastrowid}.db')
+                self._conn.execute('UPDATE profiles SET shard = ? WHERE id = ?',
+                                   (path, cur.lastrowid))
+        except sqlite3.IntegrityError:
+            return self.shard_path(name)  # created concurrently
+        init_db(path).close()
+        return path
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class UserShard:
+    """One profile's open results database: connection pool, favorites and optional writer.
+
+    shared=True means other processes write to the same database, so the
+    favorites cache watches it for their changes (see FavoritesCache.sync).
+    """
+
+    def __init__(self, path: str, write_behind: bool = False, shared: bool = False):
+        self.path = path
+        conn = init_db(path)
+        try:
+            self.favorites = FavoritesCache(path if shared else None)
+            self.favorites.load(conn)
+        finally:
+            conn.close()
+        self.pool = ConnectionPool(path, max_idle=SHARD_IDLE_CONNECTIONS)
+        self.writer = ResultWriter(path) if write_behind else None
+        self.users = 0  # requests currently holding this shard
+
+    def flush(self) -> None:
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.favorites.close()
+        self.pool.close_all()
+
+
+class _PendingShard:
+    """Placeholder for a shard one thread is opening while others wait"""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class ShardManager:
+    """Open profile shards lazily and keep at most max_open of them.
+
+    Each profile's results and favorites live in a separate SQLite file, so
+    one profile's writes never wait on another's locks. Shards are opened on
+    first use and the least recently used idle ones are closed once more
+    than max_open are open; a shard still held by a request is never closed
+    under it, so the limit can be exceeded briefly.
+    """
+
+    def __init__(self, catalog: ProfileCatalog, max_open: int = 16, write_behind: bool = False,
+                 shared: bool = False):
+        self.catalog = catalog
+        self.max_open = max_open
+        self.write_behind = write_behind
+        self.shared = shared
+        self._open: 'OrderedDict[str, UserShard]' = OrderedDict()
+        self._pending: Dict[str, _PendingShard] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, profile: str) -> UserShard:
+        """Open (or reuse) a profile's shard; pair with release().
+
+        Opening a shard runs migrations and loads favorites, so it happens
+        outside the manager lock: the lock only reserves a placeholder, and
+        other requests for the same profile wait on it while requests for
+        other profiles go ahead.
+        """
+        while True:
+            with self._lock:
+                shard = self._open.get(profile)
+                if shard is not None:
+                    self._open.move_to_end(profile)
+                    shard.users += 1
+                    evicted = self._evict()
+                    break
+                pending = self._pending.get(profile)
+                opener = pending is None
+                if opener:
+                    pending = self._pending[profile] = _PendingShard()
+            if not opener:
+                pending.ready.wait()
+                if pending.error is not None:
+                    raise pending.error
+                continue  # take the opened shard from _open
+            try:
+                path = self.catalog.shard_path(profile)
+                if path is None:
+                    raise KeyError(f'Unknown profile: {profile}')
+                shard = UserShard(path, self.write_behind, self.shared)
+            except BaseException as e:
+                with self._lock:
+                    del self._pending[profile]
+                pending.error = e
+                pending.ready.set()
+                raise
+            with self._lock:
+                del self._pending[profile]
+                self._open[profile] = shard
+                shard.users += 1
+                evicted = self._evict()
+            pending.ready.set()
+            break
+        for old in evicted:
+            old.close()
+        return shard
+
+    def release(self, shard: UserShard) -> None:
+        with self._lock:
+            shard.users -= 1
+            evicted = self._evict()
+        for old in evicted:
+            old.close()
+
+    def _evict(self) -> List[UserShard]:
+        """Remove idle shards beyond max_open, oldest first; caller holds the lock"""
+        evicted = []
+        for profile in list(self._open):
+            if len(self._open) <= self.max_open:
+                break
+            if self._open[profile].users == 0:
+                evicted.append(self._open.pop(profile))
+        return evicted
+
+    def close_all(self) -> None:
+        with self._lock:
+            shards, self._open = list(self._open.values()), OrderedDict()
+        for shard in shards:
+            shard.close()
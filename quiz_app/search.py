@@ -0,0 +1,205 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .data import Question
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by can for from has have in is it its of on or '
+    'that the this to was were what when which who why will with'.split()
+)
+
+# Where a term appears matters: a hit in the question text counts for more
+# than one in a choice or in the explanation.
+TEXT_WEIGHT = 3.0
+CHOICE_WEIGHT = 1.5
+EXPLANATION_WEIGHT = 1.0
+
+TF_SATURATION = 1.2     # BM25-style k1; repeated terms give diminishing returns
+MIN_PREFIX_LENGTH = 2   # shorter tokens only match whole terms
+MAX_PREFIX_TERMS = 64   # cap on how many terms a single prefix expands to
+PREFIX_FACTOR = 0.5     # prefix matches rank below exact matches
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """Inverted index over question text, choices and explanation.
+
+    Built once per question bank. Each posting already holds the final
+    per-term score (field-weighted, saturated term frequency times IDF), so a
+    query only intersects postings and adds numbers up. All query terms must
+    match; each one matches either exactly or as a prefix of an indexed term.
+    """
+
+    def __init__(self, questions: Iterable[Question]):
+        self._questions: List[Question] = list(questions)
+        weights: Dict[str, Dict[int, float]] = {}
+        for doc, q in enumerate(self._questions):
+            doc_weights: Dict[str, float] = {}
+            for term in tokenize(q.text):
+                doc_weights[term] = doc_weights.get(term, 0.0) + TEXT_WEIGHT
+            for choice in q.choices:
+                for term in tokenize(str(choice)):
+                    doc_weights[term] = doc_weights.get(term, 0.0) + CHOICE_WEIGHT
+            for term in tokenize(q.explanation or ''):
+                doc_weights[term] = doc_weights.get(term, 0.0) + EXPLANATION_WEIGHT
+            for term, weight in doc_weights.items():
+                weights.setdefault(term, {})[doc] = weight
+
+        n = len(self._questions)
+        k = TF_SATURATION
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # Same postings as (-score, doc) sorted best first, so top-k for a
+        # single term is a prefix of the list instead of a full scan
+        self._ranked: Dict[str, List[Tuple[float, int]]] = {}
+        for term, docs in weights.items():
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores = {doc: idf * weight * (k + 1) / (weight + k) for doc, weight in docs.items()}
+            self._postings[term] = scores
+            self._ranked[term] = sorted((-score, doc) for doc, score in scores.items())
+        self._terms: List[str] = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Indexed terms matching token, with the factor applied to their scores"""
+        matches = []
+        if token in self._postings:
+            matches.append((token, 1.0))
+        if len(token) >= MIN_PREFIX_LENGTH:
+            i = bisect_left(self._terms, token)
+            while i < len(self._terms) and len(matches) < MAX_PREFIX_TERMS:
+                term = self._terms[i]
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    matches.append((term, PREFIX_FACTOR))
+                i += 1
+        return matches
+
+    def _stream(self, matches: List[Tuple[str, float]]) -> Iterator[Tuple[float, int]]:
+        """(-score, doc) over all of a token's matching terms, best first; a doc
+        matched by several terms comes first with its best score"""
+        def scaled(term: str, factor: float) -> Iterator[Tuple[float, int]]:
+            # A function, not a nested generator expression, so each stream
+            # keeps its own factor instead of the loop's last one
+            return ((neg * factor, doc) for neg, doc in self._ranked[term])
+        return heapq.merge(*(scaled(term, factor) for term, factor in matches))
+
+    def _top_single(self, matches: List[Tuple[str, float]], limit: int,
+                    allowed: Optional[set]) -> List[Tuple[float, int]]:
+        """Top-k for a one-token query by merging the best-first posting lists"""
+        seen = set()
+        top = []
+        if limit <= 0:
+            return top
+        for neg, doc in self._stream(matches):
+            if doc in seen:
+                continue  # already taken with its best (exact or prefix) score
+            seen.add(doc)
+            if allowed and self._questions[doc].domain not in allowed:
+                continue
+            top.append((-neg, doc))
+            if len(top) == limit:
+                break
+        return top
+
+    def _token_score(self, matches: List[Tuple[str, float]], doc: int) -> float:
+        """A document's score for one query token: its best exact or prefix match"""
+        best = 0.0
+        for term, factor in matches:
+            score = self._postings[term].get(doc, 0.0) * factor
+            if score > best:
+                best = score
+        return best
+
+    def _top_multi(self, expansions: List[List[Tuple[str, float]]], limit: int,
+                   allowed: Optional[set]) -> List[Tuple[float, int]]:
+        """Top-k for a multi-token query without scoring every candidate.
+
+        Walks each token's best-first postings in turn (the threshold
+        algorithm): every newly seen document is scored in full, and the walk
+        stops once the k-th best total beats the sum of the scores the walks
+        have reached, since no unseen document can score more than that. A
+        token whose postings run out has shown every document it matches,
+        so nothing unseen can match all tokens either.
+        """
+        streams = [self._stream(matches) for matches in expansions]
+        bounds = [0.0] * len(streams)
+        seen = set()
+        top: List[Tuple[float, int]] = []  # min-heap of (score, -doc): worst kept first
+        while True:
+            for i, stream in enumerate(streams):
+                item = next(stream, None)
+                if item is None:
+                    return sorted(((score, -neg_doc) for score, neg_doc in top),
+                                  key=lambda entry: (-entry[0], entry[1]))
+                neg, doc = item
+                bounds[i] = -neg
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                if allowed and self._questions[doc].domain not in allowed:
+                    continue
+                total = 0.0
+                for matches in expansions:
+                    score = self._token_score(matches, doc)
+                    if not score:
+                        break
+                    total += score
+                else:
+                    entry = (total, -doc)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+            if len(top) == limit and top[0][0] > sum(bounds):
+                return sorted(((score, -neg_doc) for score, neg_doc in top),
+                              key=lambda entry: (-entry[0], entry[1]))
+
+    def search(self, query: str, limit: Optional[int] = 20,
+               domains: Optional[Iterable[str]] = None) -> List[Tuple[Question, float]]:
+        """Return (question, score) pairs best match first; limit=None returns all"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or (limit is not None and limit <= 0):
+            return []
+        expansions = [self._expand(token) for token in tokens]
+        if not all(expansions):
+            return []
+        allowed = set(domains) if domains else None
+
+        if limit is not None and len(expansions) == 1:
+            totals = self._top_single(expansions[0], limit, allowed)
+        elif limit is not None:
+            totals = self._top_multi(expansions, limit, allowed)
+        else:
+            # Intersect document sets (rarest first) before scoring anything
+            doc_sets = [set().union(*(self._postings[term].keys() for term, _ in matches))
+                        for matches in expansions]
+            doc_sets.sort(key=len)
+            candidates = doc_sets[0].intersection(*doc_sets[1:])
+            if allowed:
+                candidates = {doc for doc in candidates
+                              if self._questions[doc].domain in allowed}
+
+            scores = dict.fromkeys(candidates, 0.0)
+            for matches in expansions:
+                best: Dict[int, float] = {}
+                for term, factor in matches:
+                    postings = self._postings[term]
+                    for doc in candidates.intersection(postings):
+                        score = postings[doc] * factor
+                        if score > best.get(doc, 0.0):
+                            best[doc] = score
+                for doc, score in best.items():
+                    scores[doc] += score
+            totals = sorted(((score, doc) for doc, score in scores.items()),
+                            key=lambda item: (-item[0], item[1]))
+        return [(self._questions[doc], round(score, 4)) for score, doc in totals]
@@ -0,0 +1,211 @@
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from .db import ConnectionPool, connect
+
+SESSIONS_PATH = 'sessions.db'
+PURGE_INTERVAL = 600  # seconds between sweeps of expired SQLite sessions
+
+
+class SessionStore(ABC):
+    """Where server-side session data lives; sessions are serialized strings keyed by ID"""
+
+    @abstractmethod
+    def load(self, sid: str) -> Optional[Tuple[str, float]]:
+        """Data and expiry time of a live session, or None"""
+
+    @abstractmethod
+    def save(self, sid: str, data: str, ttl: float) -> None:
+        """Store data for ttl seconds from now"""
+
+    @abstractmethod
+    def touch(self, sid: str, ttl: float) -> None:
+        """Push a session's expiry to ttl seconds from now without rewriting its data"""
+
+    @abstractmethod
+    def delete(self, sid: str) -> None:
+        """Forget a session"""
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in process memory, least recently used dropped beyond max_sessions.
+
+    Fast, but sessions are lost on restart and not shared between worker
+    processes.
+    """
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._sessions: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, sid: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._sessions[sid]
+                return None
+            self._sessions.move_to_end(sid)
+            return entry[1], entry[0]
+
+    def save(self, sid: str, data: str, ttl: float) -> None:
+        with self._lock:
+            self._sessions[sid] = (time.time() + ttl, data)
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def touch(self, sid: str, ttl: float) -> None:
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                self._sessions[sid] = (time.time() + ttl, entry[1])
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in a SQLite table, so they survive restarts and are shared by workers.
+
+    Expired rows are ignored on load and swept out every PURGE_INTERVAL
+    seconds using the index on expires.
+    """
+
+    def __init__(self, path: str = SESSIONS_PATH):
+        conn = connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS sessions (
+                        id TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        expires REAL NOT NULL
+                    )"""
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)')
+        finally:
+            conn.close()
+        self._pool = ConnectionPool(path, max_idle=4, row_factory=None)
+        self._next_purge = 0.0
+
+    def load(self, sid: str) -> Optional[Tuple[str, float]]:
+        conn = self._pool.acquire()
+        try:
+            row = conn.execute('SELECT data, expires FROM sessions WHERE id = ? AND expires >= ?',
+                               (sid, time.time())).fetchone()
+        finally:
+            self._pool.release(conn)
+        return (row[0], row[1]) if row else None
+
+    def save(self, sid: str, data: str, ttl: float) -> None:
+        now = time.time()
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO sessions (id, data, expires) VALUES (?, ?, ?)',
+                             (sid, data, now + ttl))
+                if now >= self._next_purge:
+                    self._next_purge = now + PURGE_INTERVAL
+                    conn.execute('DELETE FROM sessions WHERE expires < ?', (now,))
+        finally:
+            self._pool.release(conn)
+
+    def touch(self, sid: str, ttl: float) -> None:
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                conn.execute('UPDATE sessions SET expires = ? WHERE id = ?', (time.time() + ttl, sid))
+        finally:
+            self._pool.release(conn)
+
+    def delete(self, sid: str) -> None:
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                conn.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+        finally:
+            self._pool.release(conn)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False,
+                 expires: float = 0.0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires = expires  # when the store drops it, as of loading
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keep session data in a SessionStore; the cookie only carries a random session ID.
+
+    Session data is serialized the same way Flask serializes its cookie
+    sessions and written back only when a request changed it, so reading a
+    question costs one store lookup and no write. Sessions that are only
+    read still have their expiry extended, once less than half the TTL is
+    left, so an active quiz never times out.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store: SessionStore, ttl: float = 7 * 24 * 3600):
+        self.store = store
+        self.ttl = ttl
+
+    def open_session(self, app, request) -> ServerSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            entry = self.store.load(sid)
+            if entry is not None:
+                data, expires = entry
+                try:
+                    return ServerSession(self.serializer.loads(data), sid=sid, expires=expires)
+                except ValueError:
+                    pass  # unreadable entry: start over
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session: ServerSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            if session.expires - time.time() < self.ttl / 2:
+                self.store.touch(session.sid, self.ttl)
+            return
+
+        self.store.save(session.sid, self.serializer.dumps(dict(session)), self.ttl)
+        response.vary.add('Cookie')
+        if not session.new and not session.permanent:
+            return  # the browser already has this ID
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
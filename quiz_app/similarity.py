@@ -0,0 +1,108 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # related questions are optional, like Ollama explanations
+    np = None
+
+from .data import Question
+from .search import tokenize
+
+
+def similarity_available() -> bool:
+    return np is not None
+
+
+class RelatedIndex:
+    """TF-IDF vectors for every question, for "related questions" lookups.
+
+    The matrix is kept in CSR form as three NumPy arrays (indptr, indices,
+    data) with L2-normalized rows, so cosine similarity is a dot product.
+    Scoring queries against the whole bank is one gather, one multiply and
+    one np.add.reduceat over the stored values; no Python loop runs per
+    question pair.
+    """
+
+    def __init__(self, questions: Iterable[Question]):
+        if np is None:
+            raise RuntimeError('NumPy is required for related question lookups')
+        self._questions: List[Question] = list(questions)
+        self._positions: Dict[str, int] = {}
+        vocab: Dict[str, int] = {}
+        rows: List[Dict[int, int]] = []
+        for pos, q in enumerate(self._questions):
+            self._positions.setdefault(q.id, pos)
+            counts: Dict[int, int] = {}
+            text = ' '.join([q.text, *map(str, q.choices), q.explanation or ''])
+            for term in tokenize(text):
+                col = vocab.setdefault(term, len(vocab))
+                counts[col] = counts.get(col, 0) + 1
+            rows.append(counts)
+
+        n = len(rows)
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=n)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        nnz = int(self.indptr[-1])
+        self.indices = np.fromiter((c for r in rows for c in r), dtype=np.int32, count=nnz)
+        counts = np.fromiter((v for r in rows for v in r.values()), dtype=np.float32, count=nnz)
+
+        # Sublinear tf, smoothed idf, then L2-normalize each row
+        df = np.bincount(self.indices, minlength=len(vocab)).astype(np.float32)
+        idf = np.log((1 + n) / (1 + df)) + 1
+        self.data = np.log1p(counts) * idf[self.indices]
+        row_ids = np.repeat(np.arange(n), lengths)
+        norms = np.sqrt(np.bincount(row_ids, weights=self.data ** 2, minlength=n))
+        norms[norms == 0] = 1
+        self.data /= norms[row_ids].astype(np.float32)
+        self.vocab_size = len(vocab)
+
+        # Domain of each row as a small integer, for vectorized filtering
+        self._domain_codes: Dict[str, int] = {}
+        self.domains = np.fromiter(
+            (self._domain_codes.setdefault(q.domain, len(self._domain_codes))
+             for q in self._questions),
+            dtype=np.int32, count=n)
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def _dense_rows(self, positions: Sequence[int]):
+        """Densify the given rows into a (len(positions), vocab) matrix"""
+        dense = np.zeros((len(positions), self.vocab_size), dtype=np.float32)
+        for i, pos in enumerate(positions):
+            start, end = self.indptr[pos], self.indptr[pos + 1]
+            dense[i, self.indices[start:end]] = self.data[start:end]
+        return dense
+
+    def similarities(self, positions: Sequence[int]):
+        """Cosine similarity of each given row against every question: (len(positions), n)"""
+        queries = self._dense_rows(positions)
+        products = queries[:, self.indices] * self.data  # (m, nnz)
+        # Sum products per stored row; empty rows would otherwise pick up
+        # their neighbour's first value from reduceat
+        sums = np.zeros((len(positions), len(self._questions)), dtype=np.float32)
+        nonempty = np.flatnonzero(np.diff(self.indptr))
+        if len(nonempty):
+            sums[:, nonempty] = np.add.reduceat(products, self.indptr[nonempty], axis=1)
+        return sums
+
+    def related(self, question_ids: Iterable[str], k: int = 10,
+                domains: Optional[Iterable[str]] = None) -> List[Tuple[Question, float]]:
+        """Top-k questions most similar to any of question_ids (excluding them)"""
+        positions = [self._positions[qid] for qid in dict.fromkeys(question_ids)
+                     if qid in self._positions]
+        if not positions or k <= 0:
+            return []
+
+        scores = self.similarities(positions).max(axis=0)
+        scores[positions] = -1  # never suggest the question itself
+        if domains:
+            allowed = [self._domain_codes[d] for d in domains if d in self._domain_codes]
+            scores[~np.isin(self.domains, allowed)] = -1
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self._questions[pos], round(float(scores[pos]), 4))
+                for pos in top if scores[pos] > 0]
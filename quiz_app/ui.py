@@ -1,21 +1,28 @@
+import queue
 import random
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 import json
 
-from .data import Question
-from .db import save_result, is_favorite, mark_favorite, get_results_summary, get_favorite_questions
-from .ollama import ask_model
+from .data import QuestionStore
+from .db import save_result, get_results_summary, FavoritesCache, ResultWriter
+from .ollama import ask_model, ModelDiscovery
 
 
 class QuizUI:
-    def __init__(self, root: tk.Tk, questions: List[Question], conn, model: str):
+    def __init__(self, root: tk.Tk, questions: QuestionStore, conn, model: str,
+                 discovery: Optional[ModelDiscovery] = None,
+                 writer: Optional[ResultWriter] = None):
         self.root = root
         self.all_questions = questions
-        self.questions = questions.copy()
+        self.questions = list(questions)
         self.conn = conn
         self.model = model
+        self.discovery = discovery  # background Ollama lookup, fills in model
+        self.writer = writer  # optional write-behind queue for results
+        self.favorites = FavoritesCache()
+        self.favorites.load(conn)
         self.index = 0
         self.user_answer = None
         self.order_items = []
@@ -349,7 +356,7 @@ class QuizUI:
 
     def show_domain_selection(self):
         """Show domain selection dialog with better styling"""
-        domains = sorted(set(q.domain for q in self.all_questions))
+        catalog = self.all_questions.catalog
         
         dialog = self.create_dialog("Select CISSP Domains", 600, 500)
 
@@ -378,7 +385,8 @@ class QuizUI:
 
         # Domain checkboxes with better styling
         self.domain_vars = {}
-        for domain in domains:
+        for info in catalog.domains:
+            domain = info.name
             var = tk.BooleanVar(value=True)
             self.domain_vars[domain] = var
             
@@ -387,7 +395,7 @@ class QuizUI:
             
             cb = tk.Checkbutton(
                 frame,
-                text=f"{domain} ({sum(1 for q in self.all_questions if q.domain == domain)} questions)",
+                text=f"{domain} ({info.count} questions)",
                 variable=var,
                 fg=self.colors['text_primary'],
                 bg=self.colors['bg_secondary'],
@@ -432,7 +440,7 @@ class QuizUI:
             
         dialog.destroy()
         self.selected_domains = set(selected)
-        self.questions = [q for q in self.all_questions if q.domain in selected]
+        self.questions = self.all_questions.by_domains(selected)
         random.shuffle(self.questions)
         self.index = 0
         self.quiz_mode = 'normal'
@@ -440,12 +448,12 @@ class QuizUI:
 
     def review_favorites(self):
         """Show favorite questions for review"""
-        fav_ids = get_favorite_questions(self.conn)
+        fav_ids = self.favorites.ids()
         if not fav_ids:
             messagebox.showinfo("Info", "No favorite questions found.")
             return
             
-        self.questions = [q for q in self.all_questions if q.id in fav_ids]
+        self.questions = self.all_questions.get_many(fav_ids)
         random.shuffle(self.questions)
         self.index = 0
         self.quiz_mode = 'favorites'
@@ -453,6 +461,8 @@ class QuizUI:
 
     def show_statistics(self):
         """Show performance statistics with better styling"""
+        if self.writer is not None:
+            self.writer.flush()
         stats = get_results_summary(self.conn)
         if not stats:
             messagebox.showinfo("Statistics", "No quiz results found yet.")
@@ -582,7 +592,7 @@ class QuizUI:
         
         self.txt_question.config(text=q.text)
         
-        fav = is_favorite(self.conn, q.id)
+        fav = q.id in self.favorites
         self.btn_fav.config(text='★ Unfavorite' if fav else '☆ Favorite')
         
         if q.type == 'mcq':
@@ -668,7 +678,18 @@ class QuizUI:
             answer = [item.strip() for item in self.lb.get(0, 'end')]
             correct = (answer == q.answer)
             
-        save_result(self.conn, q.id, json.dumps(answer), json.dumps(q.answer), correct, q.domain)
+        queued = False
+        if self.writer is not None:
+            try:
+                self.writer.submit(q.id, json.dumps(answer), json.dumps(q.answer), correct, q.domain,
+                                   timeout=2.0)
+                queued = True
+            except queue.Full:
+                print('Write-behind queue is full; saving the answer directly')
+            except RuntimeError as e:
+                print(f'Write-behind unavailable ({e}); saving the answer directly')
+        if not queued:
+            save_result(self.conn, q.id, json.dumps(answer), json.dumps(q.answer), correct, q.domain)
         
         result_text = '✅ Correct!' if correct else f'❌ Incorrect\n\nCorrect answer: {q.answer}'
         if hasattr(q, 'explanation') and q.explanation:
@@ -702,11 +723,15 @@ class QuizUI:
 
     def toggle_fav(self):
         q = self.questions[self.index]
-        fav = is_favorite(self.conn, q.id)
-        mark_favorite(self.conn, q.id, not fav)
-        self.btn_fav.config(text='★ Unfavorite' if not fav else '☆ Favorite')
+        fav = self.favorites.toggle(self.conn, q.id)
+        self.btn_fav.config(text='★ Unfavorite' if fav else '☆ Favorite')
 
     def explain(self):
+        if not self.model and self.discovery is not None:
+            self.model = self.discovery.model
+        if not self.model and self.discovery is not None and self.discovery.warming_up:
+            messagebox.showinfo('⏳ AI Warming Up', 'Still looking for Ollama models.\n\nPlease try again in a moment.')
+            return
         if not self.model:
             messagebox.showwarning('⚠️ AI Unavailable', 'No Ollama model available for explanations.\n\nMake sure Ollama is running and has models installed.')
             return
@@ -0,0 +1,131 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .data import (FileLoadResult, Question, QuestionStore, QUIZ_JSON_PATH, load_questions,
+                   load_quiz_json, find_pack_files, load_pack_file, report_file_results)
+
+FileSignature = Tuple[int, int]  # (mtime_ns, size)
+
+
+class QuestionBankWatcher:
+    """Poll quiz.json and data_dir for changes and rebuild the question bank.
+
+    Only files whose mtime or size changed are re-parsed; untouched files
+    reuse their already-loaded questions. Each rebuild produces a brand new
+    QuestionStore (with its own indexes and catalog) that is handed to
+    on_reload, so callers swap a single reference and requests that already
+    hold the old store keep a consistent snapshot.
+    """
+
+    def __init__(self, folder: str, on_reload: Optional[Callable[[QuestionStore], None]] = None,
+                 workers: int = 0):
+        self.folder = folder
+        self.on_reload = on_reload
+        self.workers = workers
+        self.store = QuestionStore()
+        self._signatures: Dict[str, FileSignature] = {}
+        self._by_file: Dict[str, List[Question]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _watched_files(self) -> List[str]:
+        paths = [QUIZ_JSON_PATH] if os.path.exists(QUIZ_JSON_PATH) else []
+        paths.extend(find_pack_files(self.folder))
+        return paths
+
+    def _scan(self) -> Dict[str, FileSignature]:
+        signatures = {}
+        for path in self._watched_files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed between walk and stat
+            signatures[path] = (st.st_mtime_ns, st.st_size)
+        return signatures
+
+    def _parse(self, path: str) -> Optional[List[Question]]:
+        """Parse a single file, returning None if it cannot be loaded"""
+        if path == QUIZ_JSON_PATH:
+            try:
+                return load_quiz_json(path)
+            except Exception as e:
+                print(f'Could not reload {path}: {e}')
+                return None
+        result, records = load_pack_file(path)
+        if result.error:
+            print(f'Could not reload {path}: {result.error}')
+            return None
+        return [Question(*record) for record in records]
+
+    def load(self) -> QuestionStore:
+        """Do the initial full load and remember the state of every file"""
+        with self._lock:
+            # Stat before loading so an edit made during the load is picked
+            # up by the next check() instead of being missed.
+            self._signatures = self._scan()
+            file_results: List[FileLoadResult] = []
+            store = load_questions(self.folder, workers=self.workers, file_results=file_results)
+            report_file_results(file_results)
+            by_file: Dict[str, List[Question]] = {}
+            for q in store:
+                by_file.setdefault(q.filepath, []).append(q)
+            self._by_file = by_file
+            self.store = store
+            return store
+
+    def check(self) -> bool:
+        """Re-parse changed, added or removed files; return True if the bank was swapped"""
+        with self._lock:
+            current = self._scan()
+            changed = [p for p, sig in current.items() if self._signatures.get(p) != sig]
+            removed = [p for p in self._signatures if p not in current]
+            if not changed and not removed:
+                return False
+
+            for path in removed:
+                self._by_file.pop(path, None)
+                del self._signatures[path]
+            reloaded = 0
+            for path in changed:
+                questions = self._parse(path)
+                # A half-written or broken file keeps its previous questions
+                # and signature, so the next poll tries it again
+                if questions is not None:
+                    self._by_file[path] = questions
+                    self._signatures[path] = current[path]
+                    reloaded += 1
+            if not reloaded and not removed:
+                return False  # nothing parsed yet; the bank is unchanged
+
+            store = QuestionStore(q for path in current for q in self._by_file.get(path, ()))
+            self.store = store
+            print(f'Reloaded question bank: {reloaded} changed, {len(removed)} removed, '
+                  f'{len(store)} questions')
+            # Still under the lock so consecutive reloads are published in order
+            if self.on_reload:
+                self.on_reload(store)
+        return True
+
+    def start(self, interval: float = 5.0) -> None:
+        """Poll for changes every interval seconds in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,),
+                                        name='question-bank-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f'Question bank reload failed: {e}')
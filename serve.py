@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Production entry point: a pre-forking server for the quiz web app.
+
+The parent process loads the question bank and its search and similarity
+indexes once, then forks worker processes that serve requests on a shared
+listening socket. Workers inherit the loaded bank copy-on-write, so adding
+workers costs neither load time nor another copy of the bank.
+
+    python serve.py --workers 4 --port 8000
+
+Signals sent to the parent:
+    HUP         reload config and question bank, then replace workers gracefully
+    TERM, INT   stop workers gracefully and exit
+
+Workers answer GET /ready with 200 while they take requests and 503 while
+they start up or drain, for load balancer health checks.
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from werkzeug.serving import make_server
+
+import app as quiz_web
+from quiz_app.config import load_config
+
+LISTEN_BACKLOG = 128
+RESPAWN_DELAY = 1.0  # seconds between restarts of a crashing worker slot
+
+
+class PreforkServer:
+    """Parent process that preloads the app and supervises forked workers.
+
+    Each worker runs a threaded WSGI server on the inherited socket. On a
+    reload (SIGHUP or a changed question bank) the parent loads the new
+    bank, forks a new generation and only then asks the old workers to
+    finish their in-flight requests and exit, so nothing is refused while
+    they are replaced. Workers that die are restarted in their slot.
+    """
+
+    def __init__(self, host: str, port: int, workers: int, graceful_timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.graceful_timeout = graceful_timeout
+        self.cfg = load_config()
+        self.workers: Dict[int, int] = {}     # pid -> slot, current generation
+        self.retiring: Dict[int, float] = {}  # pid -> kill deadline, old generations
+        self._reload = False
+        self._stop = False
+        self.sock = None
+        self.metrics_dir = None  # per-worker metrics snapshots, summed by /metrics
+
+    def _listen(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(LISTEN_BACKLOG)
+        # Every worker waits on this socket; non-blocking so the ones that
+        # lose the race for a connection go back to waiting
+        sock.setblocking(False)
+        sock.set_inheritable(True)
+        return sock
+
+    def _preload(self, full: bool) -> None:
+        """Load (full) or refresh the bank in the parent and freeze it for sharing"""
+        # Frozen objects are never collected: thaw so a replaced bank can be
+        gc.unfreeze()
+        if full:
+            quiz_web.preload_app(self.cfg)
+        gc.collect()
+        # Keep the collector from touching (and so copying) the shared
+        # pages of preloaded objects in the workers
+        gc.freeze()
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = slot
+            return
+        try:
+            self._run_worker(slot)
+            code = 0
+        except BaseException as e:
+            print(f'Worker {os.getpid()} failed: {e}', file=sys.stderr)
+            code = 1
+        os._exit(code)  # never return into the parent's loop
+
+    def _run_worker(self, slot: int) -> None:
+        for sig in (signal.SIGHUP, signal.SIGINT):
+            signal.signal(sig, signal.SIG_IGN)
+        cfg = self.cfg
+        if self.worker_count > 1 and cfg.get('write_behind'):
+            # A worker's queue is invisible to the others (and to their
+            # flushes before statistics), so every answer is written at once
+            cfg = dict(cfg, write_behind=False)
+        # Counts recorded by the parent before the fork would otherwise be
+        # added up once per worker in /metrics
+        quiz_web.metrics_registry.reset()
+        # Only slot 0 runs once-per-deployment jobs such as compaction
+        quiz_web.start_app(cfg, watch=False, background_jobs=slot == 0,
+                           shared=self.worker_count > 1, metrics_dir=self.metrics_dir)
+        server = make_server(self.host, self.port, quiz_web.app, threaded=True,
+                             fd=self.sock.fileno())
+        server.daemon_threads = False  # server_close() waits for in-flight requests
+
+        def drain(signum, frame):
+            quiz_web.worker_state = 'draining'
+            # shutdown() blocks until serve_forever() returns, which runs here
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, drain)
+        print(f'Worker {os.getpid()} (slot {slot}) serving {len(quiz_web.bank.store)} questions')
+        server.serve_forever()
+        server.server_close()
+        quiz_web.stop_app()
+
+    def _replace_workers(self) -> None:
+        """Start a new generation, then retire the old one"""
+        old = list(self.workers)
+        self.workers = {}
+        for slot in range(self.worker_count):
+            self._spawn(slot)
+        self._retire(old)
+
+    def _retire(self, pids: List[int]) -> None:
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.retiring[pid] = deadline
+            self._signal(pid, signal.SIGTERM)
+
+    @staticmethod
+    def _signal(pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self) -> None:
+        """Collect exited workers and restart current-generation ones that died"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.retiring.pop(pid, None)
+            slot = self.workers.pop(pid, None)
+            if slot is not None and not self._stop:
+                print(f'Worker {pid} exited unexpectedly (status {status}); restarting')
+                time.sleep(RESPAWN_DELAY)
+                self._spawn(slot)
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now >= deadline:
+                print(f'Worker {pid} did not finish within {self.graceful_timeout}s; killing it')
+                self._signal(pid, signal.SIGKILL)
+                self.retiring[pid] = float('inf')
+
+    def _on_reload(self, signum, frame) -> None:
+        self._reload = True
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stop = True
+
+    def run(self) -> None:
+        self.sock = self._listen()
+        self.metrics_dir = tempfile.mkdtemp(prefix='quiz-metrics-')
+        self._preload(full=True)
+        watcher = quiz_web.question_watcher
+        reload_interval = self.cfg.get('reload_interval', 5)
+        next_check = time.monotonic() + reload_interval
+
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        for slot in range(self.worker_count):
+            self._spawn(slot)
+        print(f'Serving on http://{self.host}:{self.port} with {self.worker_count} workers '
+              f'(master pid {os.getpid()})')
+
+        while not self._stop:
+            time.sleep(0.5)
+            self._reap()
+            self._kill_overdue()
+            if self._reload:
+                self._reload = False
+                print('Reloading configuration and question bank')
+                self.cfg = load_config()
+                self._preload(full=True)
+                watcher = quiz_web.question_watcher
+                self._replace_workers()
+            elif reload_interval and time.monotonic() >= next_check:
+                next_check = time.monotonic() + reload_interval
+                # The watcher swaps the bank in the parent; workers pick it
+                # up by being replaced
+                if watcher.check():
+                    self._preload(full=False)
+                    self._replace_workers()
+
+        print('Stopping workers')
+        self._retire(list(self.workers))
+        self.workers = {}
+        while self.retiring:
+            self._reap()
+            self._kill_overdue()
+            time.sleep(0.1)
+        self.sock.close()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+
+def main():
+    cfg = load_config()
+    parser = argparse.ArgumentParser(description='Serve the CISSP quiz with pre-forked workers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=cfg.get('workers', 0),
+                        help='worker processes (default: one per CPU core)')
+    parser.add_argument('--graceful-timeout', type=float, default=cfg.get('graceful_timeout', 30),
+                        help='seconds a worker may take to finish its requests on reload or stop')
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        sys.exit('serve.py needs os.fork(); use "python app.py" on this platform')
+    if cfg.get('session_store', 'sqlite') == 'memory':
+        print('Warning: "session_store": "memory" is per process, so a quiz only works while '
+              'its requests reach the same worker; use "sqlite"')
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and cfg.get('write_behind'):
+        print('Warning: "write_behind" is ignored with more than one worker; answers are '
+              'written as they are submitted')
+    PreforkServer(args.host, args.port, workers, args.graceful_timeout).run()
+
+
+if __name__ == '__main__':
+    main()
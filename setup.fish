@@ -32,8 +32,8 @@ echo "📦 Installing system dependencies..."
 set_color normal
 
 # Install Python dependencies via pacman (following user preference)
-echo "Installing Python Flask and Requests..."
-if not sudo pacman -S --needed --noconfirm python-flask python-requests
+echo "Installing Python Flask, Requests and NumPy..."
+if not sudo pacman -S --needed --noconfirm python-flask python-requests python-numpy
     set_color red
     echo "❌ Failed to install Python dependencies"
     set_color normal
@@ -186,6 +186,7 @@ if not test -f SETUP_COMPLETE.md
 ## Dependencies Installed
 - ✅ python-flask (web framework)  
 - ✅ python-requests (HTTP client)
+- ✅ python-numpy (related questions)
 ' > SETUP_COMPLETE.md
 
     if type -q ollama
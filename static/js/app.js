@@ -29,6 +29,50 @@ function setLoading(element, loading = true) {
     }
 }
 
+// Profile switcher in the navbar; each profile has its own results and favorites
+const NEW_PROFILE = '__new__';
+
+function loadProfiles() {
+    const select = document.getElementById('profileSelect');
+    if (!select) return;
+    fetch('/api/profiles')
+    .then(response => response.json())
+    .then(data => {
+        select.innerHTML = '';
+        data.profiles.forEach(name => {
+            const option = document.createElement('option');
+            option.value = name;
+            option.textContent = '👤 ' + name;
+            option.selected = name === data.current;
+            select.appendChild(option);
+        });
+        const option = document.createElement('option');
+        option.value = NEW_PROFILE;
+        option.textContent = '+ New profile…';
+        select.appendChild(option);
+        select.dataset.current = data.current;
+    })
+    .catch(error => console.error('Error loading profiles:', error));
+}
+
+function switchProfile(name) {
+    fetch('/api/profiles', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ name })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            alert(data.error);
+            loadProfiles();
+        } else {
+            window.location.href = '/';
+        }
+    })
+    .catch(error => alert('Error switching profile: ' + error.message));
+}
+
 // Keyboard navigation
 document.addEventListener('keydown', function(e) {
     // Handle Escape key to close modals
@@ -44,6 +88,22 @@ document.addEventListener('keydown', function(e) {
 document.addEventListener('DOMContentLoaded', function() {
     console.log('CISSP Quiz Web App initialized');
     
+    const profileSelect = document.getElementById('profileSelect');
+    if (profileSelect) {
+        loadProfiles();
+        profileSelect.addEventListener('change', () => {
+            let name = profileSelect.value;
+            if (name === NEW_PROFILE) {
+                name = (prompt('Name for the new profile:') || '').trim();
+            }
+            if (name && name !== profileSelect.dataset.current) {
+                switchProfile(name);
+            } else {
+                profileSelect.value = profileSelect.dataset.current;
+            }
+        });
+    }
+    
     // Add smooth scrolling to all anchor links
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
         anchor.addEventListener('click', function (e) {